@@ -2,23 +2,51 @@
 Database configuration and session management
 PostgreSQL database setup for VTU Results System (Production-grade)
 """
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
-from typing import Generator
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, MappedAsDataclass, Session, scoped_session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from typing import AsyncGenerator, Optional, Tuple
+from starlette.types import ASGIApp, Receive, Scope, Send
+from contextvars import ContextVar
+from functools import lru_cache
+import asyncio
+import itertools
+import logging
 import os
+import orjson
 from dotenv import load_dotenv
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
+# Logger that receives SQL statements from every engine built here
+SQL_LOGGER_NAME = "sqlalchemy.engine.Engine.automarks"
 
+# Parse .env once per process; re-imports (pytest, --reload) skip it
+if os.getenv("AUTOMARKS_DOTENV_LOADED") != "1":
+    load_dotenv()
+    os.environ["AUTOMARKS_DOTENV_LOADED"] = "1"
+
+
+@lru_cache(maxsize=1)
 def get_database_url() -> str:
     """
     Build PostgreSQL database URL from environment variables.
     Supports DATABASE_URL override for container / cloud deployments.
+    Cached: the environment is read once per process.
     """
+    env = os.environ
+    full_url = env.get("DATABASE_URL")
+    host = env.get("POSTGRES_HOST")
+
     # Allow a full connection string override (Heroku, Render, Docker, etc.)
-    full_url = os.getenv("DATABASE_URL")
     if full_url:
+        if _is_sqlite(full_url) and host:
+            raise ValueError(
+                "DATABASE_URL points at SQLite but POSTGRES_HOST is also set; "
+                "unset one of them to pick a single database"
+            )
         # Heroku-style postgres:// needs to be postgresql://
         if full_url.startswith("postgres://"):
             full_url = full_url.replace("postgres://", "postgresql+psycopg2://", 1)
@@ -26,71 +54,358 @@ def get_database_url() -> str:
             full_url = full_url.replace("postgresql://", "postgresql+psycopg2://", 1)
         return full_url
 
-    user = os.getenv("POSTGRES_USER", "postgres")
-    password = os.getenv("POSTGRES_PASSWORD", "")
-    host = os.getenv("POSTGRES_HOST", "localhost")
-    port = os.getenv("POSTGRES_PORT", "5432")
-    database = os.getenv("POSTGRES_DB", "vtu_results")
-
     # If no specific postgres config is present, fallback to SQLite
-    if not os.getenv("POSTGRES_HOST") and not os.getenv("DATABASE_URL"):
+    if not host:
         return "sqlite:///./vtu_results.db"
 
+    user = env.get("POSTGRES_USER", "postgres")
+    password = env.get("POSTGRES_PASSWORD", "")
+    port = env.get("POSTGRES_PORT", "5432")
+    database = env.get("POSTGRES_DB", "vtu_results")
+
     return f"postgresql+psycopg2://{user}:{password}@{host}:{port}/{database}"
 
 
-# Database URL
-DATABASE_URL = get_database_url()
+def _is_sqlite(url: str) -> bool:
+    """Dialect check on the parsed URL (a password may contain "sqlite")."""
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def get_async_database_url(url: str) -> Tuple[str, dict]:
+    """
+    Translate a sync database URL into its async-driver equivalent.
+    psycopg2 -> asyncpg, pysqlite -> aiosqlite.
+
+    asyncpg rejects libpq's ``sslmode`` query argument, so it is stripped
+    from the URL and passed through ``connect_args["ssl"]`` instead.
+    Returns ``(url, connect_args)``.
+    """
+    parsed = make_url(url)
+    connect_args = {}
+
+    if _is_sqlite(url):
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False), connect_args
+
+    sslmode = parsed.query.get("sslmode")
+    if sslmode:
+        parsed = parsed.difference_update_query(["sslmode"])
+        connect_args["ssl"] = False if sslmode == "disable" else sslmode
+
+    return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False), connect_args
+
+
+def _json_serializer(value) -> str:
+    # orjson returns bytes; JSON columns expect str
+    return orjson.dumps(value).decode()
+
+
+def _pre_ping_enabled() -> bool:
+    return os.getenv("DB_PRE_PING", "true").lower() == "true"
+
+
+def _pgbouncer_mode() -> bool:
+    return os.getenv("DB_USE_PGBOUNCER", "false").lower() == "true"
+
+
+def _postgres_pool_kwargs() -> dict:
+    """
+    Client-side pool config for the Postgres engines. Behind PgBouncer
+    (DB_USE_PGBOUNCER=true) the bouncer owns pooling, so SQLAlchemy opens a
+    fresh connection per checkout instead of holding a second idle pool.
+    """
+    if _pgbouncer_mode():
+        return {"poolclass": NullPool}
+    return {
+        "pool_pre_ping": _pre_ping_enabled(),  # Verify connections before checkout
+        "pool_recycle": 1800,                  # Recycle connections every 30 min
+        **get_pool_settings(),                 # pool_size / max_overflow / pool_timeout
+    }
+
+
+def get_web_workers() -> int:
+    """API worker processes sharing this database (WEB_CONCURRENCY, set by run_api.py from API_WORKERS)."""
+    env = os.environ
+    return max(int(env.get("WEB_CONCURRENCY") or env.get("API_WORKERS") or 1), 1)
+
+
+def get_pool_settings() -> dict:
+    """
+    QueuePool sizing for the Postgres engines (per worker process).
+
+    DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT override the defaults.
+    Without DB_POOL_SIZE, PG_MAX_CONNECTIONS is split across the API workers
+    (get_web_workers) so the fleet can't exceed the server limit. The short timeout
+    makes a saturated pool fail fast instead of stalling requests for 30s.
+    """
+    env = os.environ
+    pool_size = env.get("DB_POOL_SIZE")
+    if pool_size is None:
+        pool_size = 20
+        max_conns = env.get("PG_MAX_CONNECTIONS")
+        if max_conns:
+            pool_size = max(min(pool_size, int(max_conns) // get_web_workers()), 1)
+
+    return {
+        "pool_size": int(pool_size),
+        "max_overflow": int(env.get("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": int(env.get("DB_POOL_TIMEOUT", "5")),
+    }
+
+
+def _set_sqlite_pragma(dbapi_conn, _connection_record):
+    """WAL + relaxed fsync for the local SQLite file; runs on every new connection."""
+    cursor = dbapi_conn.cursor()
+    # Result rows rely on ON DELETE CASCADE (no ORM cascade), which SQLite only enforces with this on
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    cursor.execute("PRAGMA cache_size=-65536")    # 64 MiB
+    cursor.close()
 
-# Mask password in log output
-if "sqlite" in DATABASE_URL:
-    _display_url = "SQLite (local file)"
-    print(f"🔌 Database Type: SQLite")
-else:
-    _display_url = DATABASE_URL.split("@")[1] if "@" in DATABASE_URL else "database"
-    print(f"🔌 Database Type: PostgreSQL")
 
-print(f"🔗 Connecting to: {_display_url}")
+def _common_engine_kwargs() -> dict:
+    """kwargs shared by every engine regardless of dialect or driver."""
+    return {
+        "json_serializer": _json_serializer,
+        "json_deserializer": orjson.loads,
+        # Statement logging goes through the "sqlalchemy.engine.Engine.automarks"
+        # logger (level set by the app) instead of echo; bound parameters are
+        # only rendered in DEBUG so prod never pays for repr() of each value
+        "logging_name": SQL_LOGGER_NAME.rsplit(".", 1)[-1],
+        "hide_parameters": os.getenv("DEBUG", "False").lower() != "true",
+        # Compiled-SQL LRU; the default 500 thrashes with the analytics query mix
+        "query_cache_size": int(os.getenv("DB_QUERY_CACHE_SIZE", "2000")),
+    }
 
-# Create engine with production-grade pool settings
-if "sqlite" in DATABASE_URL:
+
+def _build_sqlite_engine(url: str) -> Engine:
+    # SQLite connections are cheap to open, so skip pooling entirely
+    logger.info("Database: SQLite (local file)")
     engine = create_engine(
-        DATABASE_URL,
+        url,
+        poolclass=NullPool,
         connect_args={"check_same_thread": False},  # Required for SQLite in FastAPI
-        echo=os.getenv("DEBUG", "False").lower() == "true",
+        **_common_engine_kwargs(),
     )
-else:
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,          # Verify connections before checkout
-        pool_size=10,                # Baseline pool connections
-        max_overflow=20,             # Additional connections under load
-        pool_recycle=1800,           # Recycle connections every 30 min
-        pool_timeout=30,             # Wait up to 30s for a connection
-        echo=os.getenv("DEBUG", "False").lower() == "true",
+    event.listen(engine, "connect", _set_sqlite_pragma)
+    return engine
+
+
+def _build_postgres_engine(url: str) -> Engine:
+    # Mask password in log output
+    logger.info("Database: %s", make_url(url).render_as_string(hide_password=True))
+    return create_engine(
+        url,
+        # Kernel-level keepalives reap half-open sockets, so pre-ping can be
+        # switched off (DB_PRE_PING=false) to save a SELECT 1 per checkout
+        connect_args={
+            "keepalives": 1,
+            "keepalives_idle": 30,
+            "keepalives_interval": 10,
+            "keepalives_count": 5,
+            "application_name": "automarks_be",
+        },
+        **_postgres_pool_kwargs(),
+        # Multi-row INSERT ... VALUES for executemany, execute_batch for UPDATE/DELETE
+        executemany_mode="values_plus_batch",
+        insertmanyvalues_page_size=1000,
+        executemany_batch_page_size=500,
+        **_common_engine_kwargs(),
     )
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create Base class
-Base = declarative_base()
+def _build_sqlite_async_engine(url: str, connect_args: dict) -> AsyncEngine:
+    # aiosqlite runs each connection on its own thread; no check_same_thread
+    engine = create_async_engine(url, poolclass=NullPool, **_common_engine_kwargs())
+    event.listen(engine.sync_engine, "connect", _set_sqlite_pragma)
+    return engine
+
+
+def _build_postgres_async_engine(url: str, connect_args: dict) -> AsyncEngine:
+    connect_args.setdefault("server_settings", {"application_name": "automarks_be"})
+    if _pgbouncer_mode():
+        # Transaction pooling hands each transaction a different backend, so
+        # prepared statements (asyncpg's and SQLAlchemy's caches) can't be reused
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_cache_size"] = 0
+    return create_async_engine(
+        url,
+        connect_args=connect_args,
+        **_postgres_pool_kwargs(),
+        insertmanyvalues_page_size=1000,
+        **_common_engine_kwargs(),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_engine() -> Engine:
+    """
+    Build the sync engine on first use rather than at import time, so each
+    uvicorn worker creates its own pool after fork. The dialect is resolved
+    once here and dispatched to a builder holding only that dialect's kwargs.
+    """
+    database_url = get_database_url()
+    builder = _build_sqlite_engine if _is_sqlite(database_url) else _build_postgres_engine
+    return builder(database_url)
 
 
-def get_db() -> Generator:
+@lru_cache(maxsize=1)
+def get_sessionmaker() -> sessionmaker:
+    """
+    Session factory bound to the lazily created sync engine.
+    expire_on_commit=False: objects stay readable after commit without a
+    re-SELECT; callers that need server-generated values refresh them explicitly.
+    """
+    return sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=get_engine())
+
+
+@lru_cache(maxsize=1)
+def get_async_engine() -> AsyncEngine:
+    """
+    Async engine (asyncpg / aiosqlite) for non-blocking request handlers.
+    The sync engine stays for the pandas analyzer, scripts and DDL.
+    """
+    database_url = get_database_url()
+    async_url, connect_args = get_async_database_url(database_url)
+    builder = _build_sqlite_async_engine if _is_sqlite(database_url) else _build_postgres_async_engine
+    return builder(async_url, connect_args)
+
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker() -> async_sessionmaker:
+    """AsyncSession factory bound to the lazily created async engine (same flush/expire policy as the sync one)."""
+    return async_sessionmaker(get_async_engine(), class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def get_engine_stats() -> dict:
+    """Pool status and compiled-query cache fill of the sync engine, for tuning DB_QUERY_CACHE_SIZE."""
+    engine = get_engine()
+    # Private SQLAlchemy attribute (an LRUCache, or None when caching is off); only
+    # read for this log line, so tolerate it going away
+    cache = getattr(engine, "_compiled_cache", None)
+    return {
+        "pool": engine.pool.status(),
+        "query_cache_entries": len(cache) if cache is not None else 0,
+        "query_cache_size": getattr(cache, "capacity", 0),
+    }
+
+
+def warm_pool() -> int:
+    """
+    Open pool_size connections once and return them to the pool, so the
+    first requests after startup don't pay the connect/auth handshake.
+    No-op for NullPool (SQLite). Returns the number of connections opened.
+    """
+    pool = get_engine().pool
+    if not isinstance(pool, QueuePool):
+        return 0
+    conns = [get_engine().connect() for _ in range(pool.size())]
+    for conn in conns:
+        conn.close()
+    return len(conns)
+
+
+async def warm_async_pool() -> int:
+    """Async counterpart of warm_pool() for the asyncpg engine."""
+    engine = get_async_engine()
+    pool = engine.pool
+    if not isinstance(pool, AsyncAdaptedQueuePool):
+        return 0
+    conns = [await engine.connect() for _ in range(pool.size())]
+    await asyncio.gather(*(conn.close() for conn in conns))
+    return len(conns)
+
+
+class Base(MappedAsDataclass, DeclarativeBase, kw_only=True, eq=False):
+    """
+    Declarative base for all models. Models are mapped dataclasses, so each
+    gets a generated keyword-only __init__ instead of the kwargs-walking
+    default constructor. eq=False keeps identity-based equality and hashing.
+
+    eager_defaults=False: server-generated timestamps are not fetched back on
+    INSERT. Ingest goes through Core bulk statements anyway; a model whose
+    caller reads them right after the flush opts back in.
+    """
+
+    __mapper_args__ = {"eager_defaults": False}
+
+
+# Per-request key for the scoped session registry; set by DBSessionMiddleware
+_request_scope: ContextVar[Optional[int]] = ContextVar("db_request_scope", default=None)
+_request_counter = itertools.count(1)
+
+
+@lru_cache(maxsize=1)
+def get_scoped_session() -> scoped_session:
+    """Registry of sync Sessions, one per HTTP request (keyed by _request_scope)."""
+    return scoped_session(get_sessionmaker(), scopefunc=_request_scope.get)
+
+
+class DBSessionMiddleware:
+    """
+    Pure ASGI middleware that scopes the sync Session to the request.
+
+    It sets the context key used by get_scoped_session(); get_db() creates
+    the session lazily, so requests that never touch the DB don't allocate
+    one. The session is removed once the whole response (including streamed
+    bodies) has been sent. Register with ``app.add_middleware(DBSessionMiddleware)``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _request_scope.set(next(_request_counter))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            get_scoped_session().remove()
+            _request_scope.reset(token)
+
+
+def get_db() -> Session:
     """
     FastAPI dependency to get a database session.
-    Yields a session and ensures it is closed after use.
+    Returns the request's scoped session, creating it on first use;
+    DBSessionMiddleware removes it after the response.
+    """
+    if _request_scope.get() is None:
+        raise RuntimeError("get_db() used outside a request; is DBSessionMiddleware installed?")
+    return get_scoped_session()()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency to get an async database session.
+    The session is closed when the request finishes.
     """
-    db = SessionLocal()
-    try:
+    async with get_async_sessionmaker()() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
+_SCHEMA_READY = False
+
+
+async def init_db(force: bool = False):
     """
     Initialize database tables from ORM models.
+
+    Runs create_all once per process; later calls return immediately unless
+    force=True (e.g. test fixtures that drop tables). Set
+    AUTOMARKS_SKIP_INIT_DB=1 where the schema is managed externally
+    (Alembic / sql/schema.sql) to skip it entirely.
     """
-    Base.metadata.create_all(bind=engine)
+    global _SCHEMA_READY
+    if os.getenv("AUTOMARKS_SKIP_INIT_DB") == "1":
+        return
+    if _SCHEMA_READY and not force:
+        return
+    async with get_async_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    _SCHEMA_READY = True
@@ -4,32 +4,49 @@ VTU Results Extraction and Management System
 """
 from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Query, BackgroundTasks, WebSocket, WebSocketDisconnect, Form, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional, Set
+from typing import List, Optional, Set, Tuple
+import io
 import os
+import re
 import shutil
+import tempfile
+import time
 import uuid
 from pathlib import Path
 from datetime import datetime, date
+from functools import lru_cache
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import asyncio
-import json
-from logging.handlers import RotatingFileHandler
-from sqlalchemy import inspect, text
-import pandas as pd
-
-from app.database import get_db, init_db, engine
-from app.models import Student, Subject, Semester, Result, UploadLog, UploadStatus, Notification, Base
+import anyio.to_thread
+import orjson
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import queue
+from sqlalchemy import Enum, Integer, bindparam, case, cast, delete, exists, func, inspect, select, text, update
+
+from app.database import (
+    DBSessionMiddleware, SQL_LOGGER_NAME, get_async_db, get_db, init_db, get_engine, get_engine_stats,
+    get_pool_settings, get_sessionmaker, get_web_workers, warm_pool, warm_async_pool,
+)
+from app.models import (
+    Student, Subject, Semester, Result, UploadLog, UploadStatus, Notification, Base,
+    ANALYTICS_VIEW_DDL, IS_PASS_SQL, NORMALIZE_RESULT_STATUS_SQL, SINGLE_UPLOAD_BATCH_ID,
+)
 from app.schemas import (
     StudentResponse, SubjectResponse, SemesterResponse, ResultResponse,
     StudentCreate, SubjectCreate, SemesterCreate, ResultCreate,
     APIResponse, BatchUploadResponse, ExtractedStudentResult,
-    SubjectStatistics, SemesterSummary
+    SubjectStatistics, SemesterSummary,
+    STUDENT_LIST_TA, SUBJECT_STATS_LIST_TA, SEMESTER_SUMMARY_LIST_TA,
 )
-from app.services.extractor import extract_pdf, VTUResultExtractor
-from app.services.analyzer import ResultAnalyzer
+from app.services.extractor import extract_pdf_from_bytes, process_single_pdf, VTUResultExtractor
+from app.services.analyzer import ResultAnalyzer, refresh_analytics_views
 import logging
 
 # Load environment variables
@@ -38,9 +55,41 @@ load_dotenv()
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# SQL statement logging only when DEBUG is on
+logging.getLogger(SQL_LOGGER_NAME).setLevel(
+    logging.INFO if os.getenv("DEBUG", "False").lower() == "true" else logging.WARNING
+)
 
 # ==================== HELPER FUNCTIONS ====================
 
+# Precompiled patterns for the per-row normalization helpers
+_BATCH_RE = re.compile(r"^(\d{4})-(\d{4})$")
+# College code (1 + 2-3 letters), 2-digit admission year, 2-3 letter branch, remaining digits
+_USN_BRANCH_RE = re.compile(r"^\d[A-Z]{2,3}\d{2}([A-Z]{2,3})\d{3,}$")
+_NON_ALNUM_RE = re.compile(r"[^A-Z0-9]")
+# str.translate table deleting every ASCII char outside A-Z0-9 (C-level, no regex engine)
+_ASCII_NON_ALNUM = str.maketrans("", "", "".join(
+    chr(c) for c in range(128) if not ("A" <= chr(c) <= "Z" or "0" <= chr(c) <= "9")
+))
+_STRAY_LEADING_LETTER_RE = re.compile(
+    r"^[A-Z](INTRODUCTION|PRINCIPLES|FUNDAMENTALS|ENGINEERING|MATHEMATICS|PHYSICS|CHEMISTRY|PROGRAMMING|COMPUTER|DIGITAL|DATA|DESIGN|ANALYSIS|NETWORKS|SYSTEMS|ELECTRONICS)",
+    re.IGNORECASE,
+)
+
+# Canonical stored result status codes and long-form aliases
+_RESULT_STATUS_CODES = frozenset({"P", "F", "A", "W", "X", "NE"})
+_LONG_STATUS_TO_CODE = {
+    "PASS": "P",
+    "FAIL": "F",
+    "ABSENT": "A",
+    "WITHHELD": "W",
+    "NOT_ELIGIBLE_X": "X",
+    "NOT ELIGIBLE X": "X",
+    "NOT_ELIGIBLE_NE": "NE",
+    "NOT ELIGIBLE NE": "NE",
+}
+
+
 def normalize_result_status(value: Optional[str], to_output: bool = False) -> Optional[str]:
     """Map between various result status representations and the canonical letter codes.
 
@@ -51,26 +100,25 @@ def normalize_result_status(value: Optional[str], to_output: bool = False) -> Op
     if value is None:
         return None
 
-    val = str(value).strip().upper()
-
-    long_to_code = {
-        "PASS": "P",
-        "FAIL": "F",
-        "ABSENT": "A",
-        "WITHHELD": "W",
-        "NOT_ELIGIBLE_X": "X",
-        "NOT ELIGIBLE X": "X",
-        "NOT_ELIGIBLE_NE": "NE",
-        "NOT ELIGIBLE NE": "NE",
-    }
+    # Fast path: already a stored code (the common case on read endpoints)
+    if value in _RESULT_STATUS_CODES:
+        return value
+
+    return _normalize_result_status_slow(str(value), to_output)
+
+
+@lru_cache(maxsize=64)
+def _normalize_result_status_slow(value: str, to_output: bool) -> Optional[str]:
+    """Normalize a non-canonical status; memoized since the domain is tiny."""
+    val = value.strip().upper()
 
     # Already a known code
-    if val in {"P", "F", "A", "W", "X", "NE"}:
+    if val in _RESULT_STATUS_CODES:
         return val
 
     # Map long-form to code
-    if val in long_to_code:
-        return long_to_code[val]
+    if val in _LONG_STATUS_TO_CODE:
+        return _LONG_STATUS_TO_CODE[val]
 
     # Fallback: return untouched to avoid hard failure
     return val if to_output else None
@@ -79,7 +127,8 @@ def normalize_result_status(value: Optional[str], to_output: bool = False) -> Op
 app = FastAPI(
     title="VTU Results Management System",
     description="API for extracting and managing VTU student results from PDFs",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -91,9 +140,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# One lazily created DB session per request, closed after the response
+app.add_middleware(DBSessionMiddleware)
+
 # ==================== WEBSOCKET & LOGGING SETUP ====================
 
 # WebSocket Connection Manager
+# Seconds a single client may take to accept a frame before it is dropped
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "1.0"))
+
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Set[WebSocket] = set()
@@ -106,19 +162,88 @@ class ConnectionManager:
         self.active_connections.discard(websocket)
 
     async def broadcast(self, message: dict):
-        """Broadcast message to all connected clients"""
-        disconnected = set()
-        for connection in self.active_connections:
+        """Broadcast message to all connected clients concurrently"""
+        # Encode once with orjson; stay on text frames since clients JSON.parse event.data
+        payload = orjson.dumps(message).decode()
+
+        async def send(connection: WebSocket) -> Optional[WebSocket]:
             try:
-                await connection.send_json(message)
+                await asyncio.wait_for(connection.send_text(payload), timeout=WS_SEND_TIMEOUT)
+                return None
             except Exception:
-                disconnected.add(connection)
-        # Clean up disconnected clients
-        self.active_connections -= disconnected
+                return connection
+
+        failed = await asyncio.gather(*(send(c) for c in list(self.active_connections)))
+        # Clean up disconnected (or too slow) clients
+        self.active_connections -= {c for c in failed if c is not None}
 
 manager = ConnectionManager()
 notification_manager = ConnectionManager()
 
+
+# Notification fan-out is drained by a background task so request handlers
+# don't wait on WebSocket sends; messages beyond this backlog are dropped.
+NOTIFICATION_QUEUE_SIZE = int(os.getenv("NOTIFICATION_QUEUE_SIZE", "1024"))
+# Created on startup so the queue belongs to the serving event loop
+notification_queue: Optional[asyncio.Queue] = None
+
+
+def _queue_notification(message: dict) -> None:
+    """Hand a message to the notification worker without blocking."""
+    if notification_queue is None:
+        return
+    try:
+        notification_queue.put_nowait(message)
+    except asyncio.QueueFull:
+        logger.warning(f"Notification queue full; dropping {message.get('type')} message")
+
+
+def _broadcast_notification(n: Notification) -> None:
+    # orjson (see ConnectionManager.broadcast) encodes created_at as ISO 8601 itself
+    _queue_notification(
+        {
+            "type": "notification",
+            "data": {
+                "id": n.id,
+                "title": n.title,
+                "detail": n.detail,
+                "level": n.level,
+                "created_at": n.created_at,
+            },
+        }
+    )
+
+
+async def _notification_worker(queue: asyncio.Queue) -> None:
+    while True:
+        message = await queue.get()
+        try:
+            # broadcast sends concurrently with a per-client timeout
+            await notification_manager.broadcast(message)
+        except Exception as e:
+            logger.warning(f"Notification broadcast failed: {str(e)}")
+        finally:
+            queue.task_done()
+
+# Batch progress is coalesced into at most one broadcast per interval (seconds)
+PROGRESS_FLUSH_INTERVAL = float(os.getenv("PROGRESS_FLUSH_INTERVAL", "0.1"))
+
+
+async def _flush_progress(progress: dict) -> None:
+    """Broadcast the latest progress snapshot plus failures since the last flush."""
+    if not progress["dirty"]:
+        return
+    new_failed, progress["new_failed"] = progress["new_failed"], []
+    progress["dirty"] = False
+    await manager.broadcast({**progress["snapshot"], "new_failed": new_failed})
+
+
+async def _progress_flusher(progress: dict) -> None:
+    """Periodically flush a batch's progress until cancelled."""
+    while True:
+        await asyncio.sleep(PROGRESS_FLUSH_INTERVAL)
+        await _flush_progress(progress)
+
 # Error-only logging setup
 LOG_DIR = Path("logs")
 LOG_DIR.mkdir(exist_ok=True)
@@ -131,32 +256,108 @@ handler = RotatingFileHandler(
     backupCount=5
 )
 handler.setFormatter(logging.Formatter(
-    '%(asctime)s - BATCH:%(batch_id)s - FILE:%(filename)s - %(levelname)s - %(message)s'
+    '%(asctime)s - BATCH:%(batch_id)s - FILE:%(upload_file)s - %(levelname)s - %(message)s'
 ))
-error_logger.addHandler(handler)
-
-# Thread pool for PDF processing (8 workers for Ryzen 5)
-executor = ThreadPoolExecutor(max_workers=8)
+# Callers only enqueue; a listener thread does the file writes and rotation
+error_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+error_logger.addHandler(QueueHandler(error_log_queue))
+error_log_listener = QueueListener(error_log_queue, handler, respect_handler_level=True)
+error_log_listener.start()
+atexit.register(error_log_listener.stop)
+
+# Process pool for PDF processing: extraction is CPU-bound Python, so threads
+# would serialize on the GIL. "spawn" keeps workers free of the server's
+# threads and only imports the extractor module in each child.
+# Default: the CPUs split across the API worker processes, which each own a pool
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(max((os.cpu_count() or 8) // get_web_workers(), 1))))
+executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
 
 # Create directories
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "data/raw"))
 PROCESSED_DIR = Path(os.getenv("PROCESSED_DIR", "data/processed"))
-EXPORT_DIR = Path("data/exports")
 
 # By default, delete raw PDFs after processing to avoid filling disk.
 # Set KEEP_RAW_FILES=true to retain raw uploads for debugging/audit.
 KEEP_RAW_FILES = os.getenv("KEEP_RAW_FILES", "false").lower() in {"1", "true", "yes"}
 
-for directory in [UPLOAD_DIR, PROCESSED_DIR, EXPORT_DIR]:
+# Buffer size for streaming uploads to disk (fewer read/write syscalls per MB)
+UPLOAD_COPY_CHUNK = 1024 * 1024
+
+# Completed files between upload-log progress writes in batch uploads
+PROGRESS_DB_EVERY = int(os.getenv("PROGRESS_DB_EVERY", "50"))
+# ...or seconds, whichever comes first, so slow batches still show progress when polled
+PROGRESS_DB_INTERVAL = float(os.getenv("PROGRESS_DB_INTERVAL", "5"))
+
+# Extracted PDFs buffered per bulk upsert in batch uploads
+BULK_SAVE_BATCH_SIZE = int(os.getenv("BULK_SAVE_BATCH_SIZE", "5000"))
+
+# Excel exports are spooled in memory up to this size before rolling over to a temp file
+EXPORT_SPOOL_MAX = int(os.getenv("EXPORT_SPOOL_MAX", str(16 * 1024 * 1024)))
+
+# Exports are CPU-heavy pandas/openpyxl work; cap how many run at once so they can't
+# take every threadpool slot (and pooled connection) from the other endpoints
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", "2"))
+export_semaphore = asyncio.Semaphore(EXPORT_CONCURRENCY)
+
+for directory in [UPLOAD_DIR, PROCESSED_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
 
 
+# pg_advisory_lock key held while a worker runs the startup schema DDL below
+STARTUP_DDL_LOCK_KEY = 7415_2025
+
+
+def _acquire_startup_ddl_lock(engine):
+    """Serialize startup DDL across API worker processes; returns the connection holding the lock.
+
+    Concurrent ALTER/CREATE INDEX/CREATE MATERIALIZED VIEW from several workers race on the
+    catalog, and the loser would skip the rest of startup. SQLite runs a single process.
+    """
+    if engine.dialect.name != "postgresql":
+        return None
+    conn = engine.connect()
+    conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": STARTUP_DDL_LOCK_KEY})
+    conn.commit()
+    return conn
+
+
+def _release_startup_ddl_lock(conn) -> None:
+    if conn is None:
+        return
+    try:
+        conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": STARTUP_DDL_LOCK_KEY})
+        conn.commit()
+    finally:
+        conn.close()
+
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
     """Initialize database tables on startup"""
+    global notification_queue, RESULTS_PARTITIONED
+    notification_queue = asyncio.Queue(maxsize=NOTIFICATION_QUEUE_SIZE)
+    app.state.notification_worker = asyncio.create_task(_notification_worker(notification_queue))
+
+    ddl_lock = None
     try:
-        Base.metadata.create_all(bind=engine)
+        # Build the engine here (post-fork) so each worker owns its pool
+        engine = get_engine()
+        if engine.dialect.name != "sqlite":
+            # Never hand out more worker threads than the pool has connections
+            pool = get_pool_settings()
+            anyio.to_thread.current_default_thread_limiter().total_tokens = (
+                pool["pool_size"] + pool["max_overflow"]
+            )
+            # Open the pools up front instead of on the first requests
+            try:
+                await anyio.to_thread.run_sync(warm_pool)
+                await warm_async_pool()
+            except Exception as e:
+                logger.warning(f"Connection pool warm-up failed: {str(e)}")
+        # One worker at a time from here; later ones find the schema already in place
+        ddl_lock = await anyio.to_thread.run_sync(_acquire_startup_ddl_lock, engine)
+        await init_db()
         # Lightweight schema evolution (no migrations): add new columns if missing.
         insp = inspect(engine)
         try:
@@ -176,9 +377,25 @@ async def startup_event():
 
         # Track upload batch UUID on results for batch-level deletes/auditing
         try:
-            result_cols = {c["name"] for c in insp.get_columns("results")}
+            result_cols_info = insp.get_columns("results")
         except Exception:
-            result_cols = set()
+            result_cols_info = []
+        result_cols = {c["name"] for c in result_cols_info}
+
+        # Result status is an Enum column: legacy long-form values would not load, so rewrite
+        # them once (scripts/migrate_results_types.py then converts PostgreSQL to a native ENUM)
+        results_status_col = next((c for c in result_cols_info if c["name"] == "result_status"), None)
+        if results_status_col is not None and not isinstance(results_status_col["type"], Enum):
+            with engine.begin() as conn:
+                conn.execute(text(NORMALIZE_RESULT_STATUS_SQL))
+
+        if "is_pass" not in result_cols and result_cols:
+            # SQLite can only add generated columns as VIRTUAL; PostgreSQL stores them
+            stored = "STORED" if engine.dialect.name == "postgresql" else "VIRTUAL"
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE results ADD COLUMN is_pass BOOLEAN GENERATED ALWAYS AS ({IS_PASS_SQL}) {stored}"
+                ))
 
         if "upload_batch_id" not in result_cols:
             with engine.begin() as conn:
@@ -195,35 +412,69 @@ async def startup_event():
             with engine.begin() as conn:
                 conn.execute(text("ALTER TABLE subjects ADD COLUMN IF NOT EXISTS credits INT NULL"))
 
+        # Composite filter indexes: create_all skips indexes on tables that already exist
+        with engine.begin() as conn:
+            # Superseded by ix_results_stats_cover (same leading columns)
+            conn.execute(text("DROP INDEX IF EXISTS ix_results_semester_subject"))
+            # Plain status indexes (ORM / schema.sql names): stats use the covering index,
+            # failure lookups the partial ix_results_nonpass
+            conn.execute(text("DROP INDEX IF EXISTS ix_results_result_status"))
+            conn.execute(text("DROP INDEX IF EXISTS idx_results_result_status"))
+            # Prefixes of uq_result_student_sem_subject / ix_results_stats_cover
+            for name in ("ix_results_student_id", "idx_results_student_id",
+                         "ix_results_semester_id", "idx_results_semester_id"):
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            # Replaced by the B-tree ix_upload_logs_upload_timestamp (serves ORDER BY ... LIMIT)
+            conn.execute(text("DROP INDEX IF EXISTS ix_uploadlogs_ts_brin"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_upload_logs_upload_timestamp ON upload_logs (upload_timestamp)"))
+            for table in (Student.__table__, Semester.__table__, Result.__table__):
+                for index in table.indexes:
+                    # BRIN indexes are PostgreSQL-only (ddl_if) and skipped elsewhere
+                    if len(index.expressions) > 1 or index.dialect_options["postgresql"]["using"] == "brin":
+                        index.create(conn, checkfirst=True)
+
+        # Analytics rollups: compute once per upload instead of per request
+        if engine.dialect.name == "postgresql":
+            with engine.connect() as conn:
+                RESULTS_PARTITIONED = bool(conn.scalar(text(
+                    "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'results'::regclass"
+                )))
+            try:
+                with engine.begin() as conn:
+                    # Exports read the live join again; drop the old flat copy of results
+                    conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS mv_result_flat"))
+                    # Rebuild mv_subject_statistics from before it carried first_result_id
+                    if not conn.scalar(text(
+                        "SELECT 1 FROM pg_attribute WHERE attrelid = to_regclass('mv_subject_statistics') "
+                        "AND attname = 'first_result_id'"
+                    )):
+                        conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS mv_subject_statistics"))
+                    for ddl in ANALYTICS_VIEW_DDL:
+                        conn.execute(text(ddl))
+                ResultAnalyzer.use_materialized_views = True
+            except Exception as e:
+                logger.warning(f"Analytics materialized views unavailable: {str(e)}")
+
         # Best-effort backfill for branch on existing students
         try:
-            from app.database import SessionLocal
-
-            db = SessionLocal()
-            try:
-                students_missing_branch = (
-                    db.query(Student)
-                    .filter((Student.branch.is_(None)) | (Student.branch == ""))
-                    .limit(5000)
-                    .all()
-                )
-                updated = 0
-                for s in students_missing_branch:
-                    b = _extract_branch_from_usn(s.usn)
-                    if b:
-                        s.branch = b
-                        updated += 1
-                if updated:
-                    db.commit()
-            finally:
-                db.close()
+            if insp.has_table("students"):
+                _backfill_student_branches(engine)
         except Exception:
             # Backfill should never block startup
             pass
 
-        logger.info("Database initialized successfully")
+        logger.info("Database initialized successfully (engine: %s)", get_engine_stats())
     except Exception as e:
         logger.error(f"Error initializing database: {str(e)}")
+    finally:
+        _release_startup_ddl_lock(ddl_lock)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    worker = getattr(app.state, "notification_worker", None)
+    if worker is not None:
+        worker.cancel()
 
 
 # Root endpoint
@@ -280,6 +531,12 @@ async def websocket_notifications(websocket: WebSocket):
 
 # ==================== UPLOAD ENDPOINTS ====================
 
+def _save_upload(fileobj, file_path: Path) -> None:
+    """Stream an uploaded file to disk in large chunks (blocking)."""
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(fileobj, buffer, length=UPLOAD_COPY_CHUNK)
+
+
 @app.post("/upload/single", response_model=APIResponse)
 async def upload_single_pdf(
     file: UploadFile = File(...),
@@ -292,49 +549,39 @@ async def upload_single_pdf(
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
-    file_path: Optional[Path] = None
     try:
-        # Save uploaded file
-        file_path = UPLOAD_DIR / file.filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Extract data from PDF
-        extracted_data = extract_pdf(str(file_path))
+        # Extract straight from memory; only touch disk when raw uploads are kept
+        data = await file.read()
+        if KEEP_RAW_FILES:
+            await run_in_threadpool((UPLOAD_DIR / file.filename).write_bytes, data)
+        extracted_data = await run_in_threadpool(extract_pdf_from_bytes, data, file.filename)
 
         if not extracted_data:
             raise HTTPException(status_code=400, detail="Failed to extract data from PDF")
 
         # Save extracted data to database
-        save_extracted_data(db, extracted_data, batch=batch, upload_batch_id="SINGLE")
+        await run_in_threadpool(
+            save_extracted_data, db, extracted_data, batch=batch, upload_batch_id=SINGLE_UPLOAD_BATCH_ID
+        )
+        _schedule_analytics_refresh()
 
         # Notification (real)
         try:
-            n = _create_notification(
+            n = await run_in_threadpool(
+                _create_notification,
                 db,
                 title=f"Single PDF processed: {extracted_data.usn}",
                 detail=f"File: {file.filename}; Semester: {extracted_data.semester}; Subjects: {len(extracted_data.subjects)}",
                 level="success",
             )
-            await notification_manager.broadcast(
-                {
-                    "type": "notification",
-                    "data": {
-                        "id": n.id,
-                        "title": n.title,
-                        "detail": n.detail,
-                        "level": n.level,
-                        "created_at": n.created_at.isoformat() if n.created_at else None,
-                    },
-                }
-            )
+            _broadcast_notification(n)
         except Exception:
             pass
 
         # Save to JSON
         json_path = PROCESSED_DIR / f"{extracted_data.usn}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         extractor = VTUResultExtractor()
-        extractor.save_to_json(extracted_data, str(json_path))
+        await run_in_threadpool(extractor.save_to_json, extracted_data, str(json_path))
 
         return APIResponse(
             success=True,
@@ -352,7 +599,7 @@ async def upload_single_pdf(
         try:
             error_logger.error(
                 str(e.detail),
-                extra={"batch_id": "SINGLE", "filename": file.filename},
+                extra={"batch_id": "SINGLE", "upload_file": file.filename},
             )
         except Exception:
             pass
@@ -364,22 +611,13 @@ async def upload_single_pdf(
         try:
             error_logger.error(
                 str(e),
-                extra={"batch_id": "SINGLE", "filename": file.filename},
+                extra={"batch_id": "SINGLE", "upload_file": file.filename},
             )
         except Exception:
             pass
         logger.error(f"Error processing file: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-    finally:
-        # Avoid filling data/raw with processed PDFs
-        if file_path and not KEEP_RAW_FILES:
-            try:
-                if file_path.exists():
-                    file_path.unlink()
-            except Exception as cleanup_err:
-                logger.warning(f"Failed to delete raw file {file_path}: {cleanup_err}")
-
 
 @app.post("/upload/batch", response_model=BatchUploadResponse)
 async def upload_batch_pdfs(
@@ -401,19 +639,21 @@ async def upload_batch_pdfs(
         status=UploadStatus.PENDING.value
     )
     db.add(upload_log)
-    db.commit()
+    await run_in_threadpool(db.commit)
 
     print(f"🚀 Received batch upload request: {len(files)} files. Batch: {batch}")
     
     # Save files to disk immediately (don't pass file objects to background task)
-    saved_files = []
-    for idx, file in enumerate(files):
-        if file.filename.endswith('.pdf'):
-            file_path = UPLOAD_DIR / f"{batch_id}_{idx}_{file.filename}"
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            saved_files.append((str(file_path), file.filename))
-            print(f"  Saved file {idx+1}/{len(files)}: {file.filename}")
+    # Writes run concurrently in the threadpool (bounded by its limiter)
+    async def save_one(idx: int, file: UploadFile) -> tuple:
+        file_path = UPLOAD_DIR / f"{batch_id}_{idx}_{file.filename}"
+        await run_in_threadpool(_save_upload, file.file, file_path)
+        print(f"  Saved file {idx+1}/{len(files)}: {file.filename}")
+        return (str(file_path), file.filename)
+
+    saved_files = list(await asyncio.gather(*(
+        save_one(idx, file) for idx, file in enumerate(files) if file.filename.endswith('.pdf')
+    )))
 
     print(f"📦 Files saved. Starting background task for Batch ID: {batch_id}")
     # Start background processing with thread pool
@@ -428,26 +668,112 @@ async def upload_batch_pdfs(
     )
 
 
+def _flush_pending_results(
+    db: Session,
+    pending: List[Tuple[str, ExtractedStudentResult]],
+    batch: Optional[str],
+    upload_batch_id: str,
+    subject_cache: Optional[dict] = None,
+    semester_cache: Optional[dict] = None,
+) -> List[dict]:
+    """Save buffered (filename, extraction) pairs in one bulk upsert, falling back to one-by-one saves.
+
+    Returns {"filename", "error"} entries for the PDFs that could not be saved.
+    """
+    rejected = []
+    try:
+        save_extracted_batch(
+            db,
+            [data for _, data in pending],
+            batch=batch,
+            upload_batch_id=upload_batch_id,
+            subject_cache=subject_cache,
+            semester_cache=semester_cache,
+            rejected=rejected,
+        )
+        # Only the rejected PDFs fail; everything else was upserted
+        filenames = {id(data): filename for filename, data in pending}
+        return [{"filename": filenames[id(data)], "error": error} for data, error in rejected]
+    except Exception:
+        pass
+
+    # One bad PDF must not discard the whole buffer; retry individually
+    failures = []
+    for filename, data in pending:
+        try:
+            save_extracted_data(db, data, batch=batch, upload_batch_id=upload_batch_id)
+        except Exception as e:
+            failures.append({"filename": filename, "error": str(e)})
+    return failures
+
+
+def _execute_and_commit(db: Session, statement) -> None:
+    db.execute(statement)
+    db.commit()
+
+
+def _preload_fk_caches(db: Session) -> Tuple[dict, dict]:
+    """subject_code -> id and (number, month, year) -> semester id, loaded once per batch."""
+    subject_cache = dict(db.execute(select(Subject.subject_code, Subject.id)).all())
+    semester_cache = {
+        (number, month, year): semester_id
+        for semester_id, number, month, year in db.execute(
+            select(Semester.id, Semester.semester_number, Semester.exam_month, Semester.exam_year)
+        ).all()
+    }
+    return subject_cache, semester_cache
+
+
+def _mark_batch_failed(db: Session, batch_id: str, error: str) -> None:
+    db.rollback()
+    upload_log = db.query(UploadLog).filter(UploadLog.batch_id == batch_id).first()
+    if upload_log:
+        upload_log.status = UploadStatus.FAILED.value
+        upload_log.error_log = error
+        db.commit()
+
+
+def _record_save_failures(
+    save_failures: List[dict],
+    batch_id: str,
+    processed: int,
+    failed: int,
+    failed_files: List[dict],
+    progress: dict,
+) -> Tuple[int, int]:
+    """Move PDFs that extracted fine but failed to save from processed to failed."""
+    for failure in save_failures:
+        failed_files.append(failure)
+        progress["new_failed"].append(failure)
+        error_logger.error(
+            failure["error"],
+            extra={"batch_id": batch_id, "upload_file": failure["filename"]}
+        )
+    return processed - len(save_failures), failed + len(save_failures)
+
+
 async def process_batch_files_async(batch_id: str, files: List[tuple], batch: str):
     """
     Production-grade async batch processor with thread pool and WebSocket updates
     Features:
-    - Thread pool for parallel PDF processing (8 workers)
-    - Bulk commits every 10 PDFs
-    - Real-time WebSocket broadcasts
+    - Process pool for parallel PDF processing (PDF_WORKERS processes)
+    - Bulk upserts every BULK_SAVE_BATCH_SIZE PDFs
+    - Real-time WebSocket broadcasts (coalesced to PROGRESS_FLUSH_INTERVAL)
     - Error-only logging to file
     - Continue on failure with error notifications
     """
-    from app.database import SessionLocal
-    
-    # Create new DB session for background task
-    db = SessionLocal()
+    # Create new DB session for background task; its blocking calls all go
+    # through the threadpool so a large flush never stalls the event loop
+    db = get_sessionmaker()()
+    flusher = None
+    futures = {}
     
     try:
         # Update status to processing
-        upload_log = db.query(UploadLog).filter(UploadLog.batch_id == batch_id).first()
-        upload_log.status = UploadStatus.PROCESSING.value
-        db.commit()
+        upload_log_row = update(UploadLog).where(UploadLog.batch_id == batch_id)
+        await run_in_threadpool(
+            _execute_and_commit, db, upload_log_row.values(status=UploadStatus.PROCESSING.value)
+        )
 
         await manager.broadcast({
             "batch_id": batch_id,
@@ -462,113 +788,137 @@ async def process_batch_files_async(batch_id: str, files: List[tuple], batch: st
         failed = 0
         failed_files = []  # Track failed files for popup notification
         pending_commits = []  # Buffer for bulk commits
-
-        def process_single_pdf(file_path: str, filename: str, index: int):
-            """Process single PDF in thread pool"""
-            try:
-                # Extract data
-                extracted_data = extract_pdf(file_path)
-
-                if extracted_data:
-                    return ("success", filename, extracted_data, index)
-                else:
-                    return ("failed", filename, "Failed to extract data", index)
-
-            except Exception as e:
-                return ("error", filename, str(e), index)
-
-            finally:
-                # Avoid filling data/raw with processed PDFs
-                if not KEEP_RAW_FILES:
-                    try:
-                        p = Path(file_path)
-                        if p.exists():
-                            p.unlink()
-                    except Exception:
-                        # Deletion failure should never kill processing
-                        pass
-
-        # Submit all tasks to thread pool
+        # FK lookups shared by every bulk save of this batch (one preload each)
+        subject_cache, semester_cache = await run_in_threadpool(_preload_fk_caches, db)
+        # Latest snapshot for the coalescing flusher; only new failures are sent per tick
+        progress = {"snapshot": None, "new_failed": [], "dirty": False}
+        flusher = asyncio.create_task(_progress_flusher(progress))
+        last_file_index = None
+        progress_written, progress_written_at = 0, time.monotonic()
+
+        # Submit all tasks to the process pool
+        loop = asyncio.get_running_loop()
         futures = {
-            executor.submit(process_single_pdf, file_path, filename, idx): (filename, idx)
+            loop.run_in_executor(
+                executor, process_single_pdf, file_path, filename, idx, not KEEP_RAW_FILES
+            ): (filename, idx)
             for idx, (file_path, filename) in enumerate(files, 1)
         }
 
-        # Process completed tasks as they finish
-        for future in as_completed(futures):
-            filename, idx = futures[future]
+        # Process completed tasks as they finish (without blocking the event loop)
+        pending = set(futures)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                filename, idx = futures[future]
             
-            try:
-                status, fname, result, file_index = future.result()
-                
-                # Update current file in database
-                upload_log = db.query(UploadLog).filter(UploadLog.batch_id == batch_id).first()
-                upload_log.current_file = fname
-                upload_log.current_file_index = file_index
+                try:
+                    status, fname, result, file_index = future.result()
+                    last_file_index = file_index
                 
-                if status == "success":
-                    # Add to pending commits buffer
-                    pending_commits.append(result)
-                    processed += 1
-                    
-                    # Bulk commit every 10 PDFs (Option B)
-                    if len(pending_commits) >= 10:
-                        for data in pending_commits:
-                            save_extracted_data(db, data, batch=batch, upload_batch_id=batch_id)
-                        db.commit()
-                        pending_commits.clear()
+                    if status == "success":
+                        # Add to pending commits buffer
+                        pending_commits.append((fname, result))
+                        processed += 1
+                    else:
+                        # Handle failure
+                        failed += 1
+                        failed_files.append({"filename": fname, "error": result})
+                        progress["new_failed"].append(failed_files[-1])
                     
-                    upload_log.processed_files = processed
-                    db.commit()
-                else:
-                    # Handle failure
+                        # Log error to file
+                        error_logger.error(
+                            result,
+                            extra={"batch_id": batch_id, "upload_file": fname}
+                        )
+                
+                    # Record real-time update; the flusher broadcasts it via WebSocket
+                    percentage = int((processed + failed) / len(files) * 100)
+                    progress["snapshot"] = {
+                        "batch_id": batch_id,
+                        "current_file": fname,
+                        "current_file_index": file_index,
+                        "processed": processed,
+                        "failed": failed,
+                        "total": len(files),
+                        "percentage": percentage,
+                        "status": "processing",
+                    }
+                    progress["dirty"] = True
+
+                    # Persist progress for status polling every few completions (or seconds) only
+                    completed = processed + failed
+                    now = time.monotonic()
+                    flush_results = len(pending_commits) >= BULK_SAVE_BATCH_SIZE
+                    progress_due = (
+                        completed - progress_written >= PROGRESS_DB_EVERY
+                        or now - progress_written_at >= PROGRESS_DB_INTERVAL
+                    )
+                    if flush_results or progress_due:
+                        progress_row = upload_log_row.values(
+                            processed_files=processed,
+                            failed_files=failed,
+                            current_file=fname,
+                            current_file_index=file_index,
+                        )
+                        progress_written, progress_written_at = completed, now
+
+                    if flush_results:
+                        # Bulk upsert once the buffer is large enough; its commit
+                        # also carries the progress update staged here
+                        try:
+                            await run_in_threadpool(db.execute, progress_row)
+                            save_failures = await run_in_threadpool(
+                                _flush_pending_results,
+                                db, pending_commits, batch=batch, upload_batch_id=batch_id,
+                                subject_cache=subject_cache, semester_cache=semester_cache,
+                            )
+                        finally:
+                            # Never retry a buffer: its failures are reported below
+                            pending_commits.clear()
+                        processed, failed = _record_save_failures(
+                            save_failures, batch_id, processed, failed, failed_files, progress
+                        )
+                    elif progress_due:
+                        await run_in_threadpool(_execute_and_commit, db, progress_row)
+                
+                except Exception as e:
                     failed += 1
-                    failed_files.append({"filename": fname, "error": result})
-                    upload_log.failed_files = failed
-                    db.commit()
-                    
-                    # Log error to file
+                    failed_files.append({"filename": filename, "error": str(e)})
+                    progress["new_failed"].append(failed_files[-1])
                     error_logger.error(
-                        result,
-                        extra={"batch_id": batch_id, "filename": fname}
+                        str(e),
+                        extra={"batch_id": batch_id, "upload_file": filename}
                     )
-                
-                # Broadcast real-time update via WebSocket
-                percentage = int((processed + failed) / len(files) * 100)
-                await manager.broadcast({
-                    "batch_id": batch_id,
-                    "current_file": fname,
-                    "current_file_index": file_index,
-                    "processed": processed,
-                    "failed": failed,
-                    "total": len(files),
-                    "percentage": percentage,
-                    "status": "processing",
-                    "failed_files": failed_files  # Send failed files for popup
-                })
-                
-            except Exception as e:
-                failed += 1
-                failed_files.append({"filename": filename, "error": str(e)})
-                error_logger.error(
-                    str(e),
-                    extra={"batch_id": batch_id, "filename": filename}
-                )
+
+        flusher.cancel()
 
         # Commit any remaining PDFs in buffer
         if pending_commits:
-            for data in pending_commits:
-                save_extracted_data(db, data, batch=batch, upload_batch_id=batch_id)
-            db.commit()
+            try:
+                save_failures = await run_in_threadpool(
+                    _flush_pending_results,
+                    db, pending_commits, batch=batch, upload_batch_id=batch_id,
+                    subject_cache=subject_cache, semester_cache=semester_cache,
+                )
+            finally:
+                pending_commits.clear()
+            processed, failed = _record_save_failures(
+                save_failures, batch_id, processed, failed, failed_files, progress
+            )
+
+        # One refresh before reporting the batch done, so the dashboard rollups include it
+        await _refresh_analytics_views_once()
 
         # Final update
-        upload_log = db.query(UploadLog).filter(UploadLog.batch_id == batch_id).first()
-        upload_log.processed_files = processed
-        upload_log.failed_files = failed
-        upload_log.status = UploadStatus.COMPLETED.value if failed == 0 else UploadStatus.FAILED.value
-        upload_log.completed_timestamp = datetime.now()
-        upload_log.current_file = None
-        db.commit()
+        await run_in_threadpool(_execute_and_commit, db, upload_log_row.values(
+            processed_files=processed,
+            failed_files=failed,
+            status=UploadStatus.COMPLETED.value if failed == 0 else UploadStatus.FAILED.value,
+            completed_timestamp=datetime.now(),
+            current_file=None,
+            current_file_index=last_file_index,
+        ))
 
         # Final WebSocket broadcast
         await manager.broadcast({
@@ -578,43 +928,29 @@ async def process_batch_files_async(batch_id: str, files: List[tuple], batch: st
             "total": len(files),
             "percentage": 100,
             "status": "completed" if failed == 0 else "failed",
-            "failed_files": failed_files
+            "failed_files": failed_files  # Full list once, for the popup
         })
 
         # Summary notification (real)
         try:
             level = "success" if failed == 0 else "error"
-            n = _create_notification(
+            n = await run_in_threadpool(
+                _create_notification,
                 db,
                 title=f"Batch {batch_id} finished ({processed} ok, {failed} failed)",
                 detail=f"Batch: {batch}; Total files: {len(files)}",
                 level=level,
             )
-            await notification_manager.broadcast(
-                {
-                    "type": "notification",
-                    "data": {
-                        "id": n.id,
-                        "title": n.title,
-                        "detail": n.detail,
-                        "level": n.level,
-                        "created_at": n.created_at.isoformat() if n.created_at else None,
-                    },
-                }
-            )
+            _broadcast_notification(n)
         except Exception:
             pass
 
     except Exception as e:
         logger.error(f"Batch processing error: {str(e)}")
-        error_logger.error(str(e), extra={"batch_id": batch_id, "filename": "BATCH_ERROR"})
+        error_logger.error(str(e), extra={"batch_id": batch_id, "upload_file": "BATCH_ERROR"})
         
-        upload_log = db.query(UploadLog).filter(UploadLog.batch_id == batch_id).first()
-        if upload_log:
-            upload_log.status = UploadStatus.FAILED.value
-            upload_log.error_log = str(e)
-            db.commit()
-            
+        await run_in_threadpool(_mark_batch_failed, db, batch_id, str(e))
+
         await manager.broadcast({
             "batch_id": batch_id,
             "status": "error",
@@ -622,14 +958,30 @@ async def process_batch_files_async(batch_id: str, files: List[tuple], batch: st
         })
     
     finally:
-        db.close()
+        if flusher is not None:
+            flusher.cancel()
+        # If the batch aborted early, drop queued extractions that haven't started
+        for future in futures:
+            future.cancel()
+        await run_in_threadpool(db.close)
 
 
 
+def _canonical_batch_id(batch_id: str) -> Optional[str]:
+    """Batch ids are UUIDs; anything else can't match (and can't be cast to uuid on PostgreSQL)."""
+    try:
+        return str(uuid.UUID(batch_id))
+    except ValueError:
+        return None
+
+
 @app.get("/upload/status/{batch_id}")
-async def get_upload_status(batch_id: str, db: Session = Depends(get_db)):
+async def get_upload_status(batch_id: str, db: AsyncSession = Depends(get_async_db)):
     """Get status of a batch upload with real-time progress"""
-    upload_log = db.query(UploadLog).filter(UploadLog.batch_id == batch_id).first()
+    batch_id = _canonical_batch_id(batch_id)
+    upload_log = None
+    if batch_id is not None:
+        upload_log = await db.scalar(select(UploadLog).where(UploadLog.batch_id == batch_id))
     
     if not upload_log:
         raise HTTPException(status_code=404, detail="Batch not found")
@@ -658,20 +1010,25 @@ async def get_upload_status(batch_id: str, db: Session = Depends(get_db)):
 async def get_students(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all students with pagination"""
-    students = db.query(Student).offset(skip).limit(limit).all()
-    return students
+    students = (await db.scalars(select(Student).offset(skip).limit(limit))).all()
+    # Rows were validated on write; build the response models without re-validating
+    # (returning a Response also skips FastAPI's response_model pass, kept for the docs)
+    return Response(
+        content=STUDENT_LIST_TA.dump_json([StudentResponse.from_orm_trusted(s) for s in students]),
+        media_type="application/json",
+    )
 
 
 @app.get("/students/{usn}", response_model=StudentResponse)
-async def get_student(usn: str, db: Session = Depends(get_db)):
+async def get_student(usn: str, db: AsyncSession = Depends(get_async_db)):
     """Get student by USN"""
-    student = db.query(Student).filter(Student.usn == usn).first()
+    student = await db.scalar(select(Student).where(Student.usn == usn))
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
-    return student
+    return Response(content=StudentResponse.from_orm_trusted(student).model_dump_json(), media_type="application/json")
 
 
 # ==================== RESULTS ENDPOINTS ====================
@@ -688,48 +1045,60 @@ async def get_results(
     subject_code: Optional[str] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get results with filters"""
-    query = db.query(Result).join(Student).join(Subject).join(Semester)
+    # Explicit columns: no ORM instances or lazy relationship loads per row
+    query = select(
+        Result.id,
+        Student.usn,
+        Student.student_name,
+        Subject.subject_code,
+        Subject.subject_name,
+        Semester.semester_number,
+        Result.internal_marks,
+        Result.external_marks,
+        Result.total_marks,
+        Result.result_status,
+        Result.announced_date,
+    ).join(Result.student).join(Result.subject).join(Result.semester)
 
     if usn:
-        query = query.filter(Student.usn == usn)
+        query = query.where(Student.usn == usn)
     if semester:
-        query = query.filter(Semester.semester_number == semester)
+        query = query.where(Semester.semester_number == semester)
     if batch:
-        query = query.filter(Student.batch == batch)
+        query = query.where(Student.batch == batch)
     if branch:
-        query = query.filter(Student.branch == branch)
+        query = query.where(Student.branch == branch)
     if status:
         code = normalize_result_status(status)
-        # Accept either short code (P/F) or long-form legacy values (PASS/FAIL)
-        if code == "P":
-            query = query.filter(Result.result_status.in_(["P", "PASS"]))
-        elif code == "F":
-            query = query.filter(Result.result_status.in_(["F", "FAIL"]))
+        # Stored values are always codes (legacy PASS/FAIL rows are rewritten at startup)
+        if code in ("P", "F"):
+            query = query.where(Result.result_status == code)
     if exam_year is not None:
-        query = query.filter(Semester.exam_year == exam_year)
+        query = query.where(Semester.exam_year == exam_year)
     if exam_month:
-        query = query.filter(Semester.exam_month.ilike(exam_month))
+        query = query.where(Semester.exam_month.ilike(exam_month))
     if subject_code:
-        query = query.filter(Subject.subject_code == subject_code)
+        query = query.where(Subject.subject_code == subject_code)
 
-    results = query.offset(skip).limit(limit).all()
-    
+    # Stable paging in ingest (primary key) order: without an ORDER BY the row
+    # order follows whichever index the planner happens to pick
+    rows = (await db.execute(query.order_by(Result.id).offset(skip).limit(limit))).all()
     return [{
         "id": r.id,
-        "usn": r.student.usn,
-        "student_name": r.student.student_name,
-        "subject_code": r.subject.subject_code,
-        "subject_name": r.subject.subject_name,
-        "semester": r.semester.semester_number,
+        "usn": r.usn,
+        "student_name": r.student_name,
+        "subject_code": r.subject_code,
+        "subject_name": r.subject_name,
+        "semester": r.semester_number,
         "internal_marks": r.internal_marks,
         "external_marks": r.external_marks,
         "total_marks": r.total_marks,
-            "result_status": normalize_result_status(r.result_status, to_output=True),  # Ensure this function is defined
+        "result_status": normalize_result_status(r.result_status, to_output=True),
         "announced_date": r.announced_date
-    } for r in results]
+    } for r in rows]
 
 
 # ==================== ANALYTICS ENDPOINTS ====================
@@ -745,27 +1114,30 @@ async def get_subject_statistics(
 ):
     """Get subject-wise statistics for a semester"""
     analyzer = ResultAnalyzer(db)
-    stats = analyzer.get_subject_statistics(semester, batch=batch, branch=branch, exam_year=exam_year, exam_month=exam_month)
-    return stats
+    stats = await run_in_threadpool(
+        analyzer.get_subject_statistics, semester, batch=batch, branch=branch, exam_year=exam_year, exam_month=exam_month
+    )
+    # Encode straight to JSON bytes in pydantic-core instead of via jsonable_encoder
+    return Response(content=SUBJECT_STATS_LIST_TA.dump_json(stats), media_type="application/json")
 
 
 @app.get("/analytics/student-summary/{usn}")
 async def get_student_summary(usn: str, db: Session = Depends(get_db)):
     """Get semester-wise summary for a student"""
     analyzer = ResultAnalyzer(db)
-    summary = analyzer.get_student_summary(usn)
+    summary = await run_in_threadpool(analyzer.get_student_summary, usn)
     
     if not summary:
         raise HTTPException(status_code=404, detail="No results found for student")
     
-    return summary
+    return Response(content=SEMESTER_SUMMARY_LIST_TA.dump_json(summary), media_type="application/json")
 
 
 @app.get("/analytics/student-gpa/{usn}")
 async def get_student_gpa(usn: str, db: Session = Depends(get_db)):
     """Get SGPA per semester and running CGPA for a student (CBCS)."""
     analyzer = ResultAnalyzer(db)
-    data = analyzer.get_student_gpa_progression(usn)
+    data = await run_in_threadpool(analyzer.get_student_gpa_progression, usn)
     if not data:
         raise HTTPException(status_code=404, detail="No results found for student")
     return {"usn": usn, "gpa": data}
@@ -785,7 +1157,8 @@ async def get_top_performers(
 ):
     """Get top performing students"""
     analyzer = ResultAnalyzer(db)
-    top_performers = analyzer.get_top_performers(
+    top_performers = await run_in_threadpool(
+        analyzer.get_top_performers,
         semester,
         subject_code,
         limit,
@@ -809,7 +1182,9 @@ async def get_failure_analysis(
 ):
     """Get failure analysis for a semester"""
     analyzer = ResultAnalyzer(db)
-    analysis = analyzer.get_failure_analysis(semester, batch=batch, branch=branch, exam_year=exam_year, exam_month=exam_month)
+    analysis = await run_in_threadpool(
+        analyzer.get_failure_analysis, semester, batch=batch, branch=branch, exam_year=exam_year, exam_month=exam_month
+    )
     return analysis
 
 
@@ -823,32 +1198,9 @@ async def get_semester_overview(
 ):
     """Dashboard helper: semester-wise aggregates (avg marks, pass rate, counts)."""
     analyzer = ResultAnalyzer(db)
-    df = analyzer.get_results_dataframe(batch=batch, branch=branch, exam_year=exam_year, exam_month=exam_month)
-    if df.empty:
-        return []
-
-    # Compute per-semester aggregates
-    grouped = df.groupby("semester").agg(
-        total_records=("usn", "count"),
-        total_students=("usn", pd.Series.nunique),
-        avg_total_marks=("total_marks", "mean"),
-        pass_rate=("result_status", lambda x: float((x == "P").sum()) / float(len(x)) * 100.0 if len(x) else 0.0),
-    ).reset_index()
-
-    grouped["avg_total_marks"] = grouped["avg_total_marks"].round(2)
-    grouped["pass_rate"] = grouped["pass_rate"].round(2)
-    grouped = grouped.sort_values("semester")
-
-    return [
-        {
-            "semester": int(r.semester),
-            "total_records": int(r.total_records),
-            "total_students": int(r.total_students),
-            "avg_total_marks": float(r.avg_total_marks) if r.avg_total_marks is not None else 0.0,
-            "pass_rate": float(r.pass_rate) if r.pass_rate is not None else 0.0,
-        }
-        for r in grouped.itertuples(index=False)
-    ]
+    return await run_in_threadpool(
+        analyzer.get_semester_overview, batch=batch, branch=branch, exam_year=exam_year, exam_month=exam_month
+    )
 
 
 @app.get("/analytics/overall-statistics")
@@ -862,12 +1214,26 @@ async def get_overall_statistics(
     Optional batch/branch filters enable batch-wise dashboards.
     """
     analyzer = ResultAnalyzer(db)
-    stats = analyzer.get_overall_statistics(batch=batch, branch=branch)
+    stats = await run_in_threadpool(analyzer.get_overall_statistics, batch=batch, branch=branch)
     return stats
 
 
 # ==================== EXPORT ENDPOINTS ====================
 
+def _iter_spooled(buf, chunk_size: int = UPLOAD_COPY_CHUNK):
+    """Yield a spooled export file in chunks, closing it once fully sent"""
+    try:
+        buf.seek(0)
+        while chunk := buf.read(chunk_size):
+            yield chunk
+    finally:
+        buf.close()
+
+
+def _attachment(filename: str) -> dict:
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
 @app.get("/export/excel")
 async def export_to_excel(
     semester: Optional[int] = None,
@@ -879,15 +1245,27 @@ async def export_to_excel(
     try:
         normalized_batch = _validate_batch(batch)
         filename = f"results_sem{semester if semester else 'all'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        filepath = EXPORT_DIR / filename
-        
+
+        # The workbook is styled after writing, so openpyxl needs it whole;
+        # spool it in memory (or a temp file past EXPORT_SPOOL_MAX) instead of data/exports
+        buf = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX)
         analyzer = ResultAnalyzer(db)
-        analyzer.export_to_excel(str(filepath), semester=semester, batch=normalized_batch, branch=branch)
-        
-        return FileResponse(
-            path=str(filepath),
-            filename=filename,
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        try:
+            async with export_semaphore:
+                written = await run_in_threadpool(
+                    analyzer.export_to_excel, buf, semester=semester, batch=normalized_batch, branch=branch
+                )
+        except Exception:
+            buf.close()
+            raise
+        if not written:
+            buf.close()
+            raise HTTPException(status_code=404, detail="No data to export")
+
+        return StreamingResponse(
+            _iter_spooled(buf),
+            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers=_attachment(filename),
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -904,15 +1282,20 @@ async def export_to_csv(
     try:
         normalized_batch = _validate_batch(batch)
         filename = f"results_sem{semester if semester else 'all'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        filepath = EXPORT_DIR / filename
-        
+
+        # Build the pivot while the session is open, then stream its rows out in chunks
         analyzer = ResultAnalyzer(db)
-        analyzer.export_to_csv(str(filepath), semester=semester, batch=normalized_batch, branch=branch)
-        
-        return FileResponse(
-            path=str(filepath),
-            filename=filename,
-            media_type='text/csv'
+        async with export_semaphore:
+            pivot = await run_in_threadpool(
+                analyzer.get_student_pivot, semester=semester, batch=normalized_batch, branch=branch
+            )
+        if pivot.empty:
+            raise HTTPException(status_code=404, detail="No data to export")
+
+        return StreamingResponse(
+            ResultAnalyzer.iter_csv(pivot),
+            media_type='text/csv',
+            headers=_attachment(filename),
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -920,72 +1303,77 @@ async def export_to_csv(
 
 # ==================== DELETE ENDPOINTS ====================
 
-def _cleanup_orphans(db: Session) -> dict:
+async def _cleanup_orphans(
+    db: AsyncSession,
+    subject_ids: Optional[Set[int]] = None,
+    semester_ids: Optional[Set[int]] = None,
+    student_ids: Optional[Set[int]] = None,
+) -> dict:
     """Delete orphaned Students/Subjects/Semesters (no Result rows remain).
 
+    Uses correlated NOT EXISTS probes against the indexed Result foreign keys,
+    so no DISTINCT scan of Result is built. Runs inside the caller's transaction.
+    Passing an id set limits the check for that entity to those candidates
+    (an empty set skips it); None checks the whole table.
+
     Returns counts for each entity deleted.
     """
     counts = {"students_deleted": 0, "subjects_deleted": 0, "semesters_deleted": 0}
 
-    # Delete subjects with no results
-    subject_ids_with_results = db.query(Result.subject_id).distinct().subquery()
-    counts["subjects_deleted"] = (
-        db.query(Subject)
-        .filter(~Subject.id.in_(subject_ids_with_results))
-        .delete(synchronize_session=False)
-    )
-
-    # Delete semesters with no results
-    semester_ids_with_results = db.query(Result.semester_id).distinct().subquery()
-    counts["semesters_deleted"] = (
-        db.query(Semester)
-        .filter(~Semester.id.in_(semester_ids_with_results))
-        .delete(synchronize_session=False)
-    )
-
-    # Delete students with no results
-    student_ids_with_results = db.query(Result.student_id).distinct().subquery()
-    counts["students_deleted"] = (
-        db.query(Student)
-        .filter(~Student.id.in_(student_ids_with_results))
-        .delete(synchronize_session=False)
-    )
+    for model, fk, candidates, key in (
+        (Subject, Result.subject_id, subject_ids, "subjects_deleted"),
+        (Semester, Result.semester_id, semester_ids, "semesters_deleted"),
+        (Student, Result.student_id, student_ids, "students_deleted"),
+    ):
+        if candidates is not None and not candidates:
+            continue
+        stmt = delete(model).where(~exists().where(fk == model.id))
+        if candidates is not None:
+            stmt = stmt.where(model.id.in_(candidates))
+        res = await db.execute(stmt)
+        counts[key] = res.rowcount
 
     return counts
 
+
 @app.delete("/results/{result_id}")
-async def delete_result(result_id: int, db: Session = Depends(get_db)):
+async def delete_result(result_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a specific result record"""
     try:
-        result = db.query(Result).filter(Result.id == result_id).first()
-        if not result:
+        res = await db.execute(delete(Result).where(Result.id == result_id))
+        if not res.rowcount:
             raise HTTPException(status_code=404, detail="Result not found")
-        
-        db.delete(result)
-        db.commit()
+
+        await db.commit()
+        _schedule_analytics_refresh()
         return {"message": "Result deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.delete("/students/{usn}")
-async def delete_student(usn: str, db: Session = Depends(get_db)):
+async def delete_student(usn: str, db: AsyncSession = Depends(get_async_db)):
     """Delete a student and all their results (cascade delete)"""
     try:
-        student = db.query(Student).filter(Student.usn == usn).first()
-        if not student:
+        await db.execute(
+            delete(Result).where(Result.student_id.in_(select(Student.id).where(Student.usn == usn)))
+        )
+        res = await db.execute(delete(Student).where(Student.usn == usn))
+        if not res.rowcount:
+            await db.rollback()
             raise HTTPException(status_code=404, detail="Student not found")
-        
-        db.delete(student)
-        db.commit()
+
+        await db.commit()
+        _invalidate_meta_cache()
+        _schedule_analytics_refresh()
         return {"message": "Student and all associated results deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -997,56 +1385,49 @@ async def purge_candidate_records(
     confirm: str = Query(..., description="Type DELETE to confirm"),
     batch: Optional[str] = Query(None, description="Optional batch filter (e.g., 2022-2026)"),
     cleanup_orphans: bool = Query(True),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete all records for a candidate (USN).
 
-    This deletes the Student row which cascades to Result rows.
+    This deletes the Student row together with its Result rows.
     """
     if confirm.strip().upper() != "DELETE":
         raise HTTPException(status_code=400, detail="Confirmation required: confirm=DELETE")
 
     try:
-        query = db.query(Student).filter(Student.usn == usn)
+        matches = [Student.usn == usn]
         if batch:
-            query = query.filter(Student.batch == batch)
-        
-        student = query.first()
-        if not student:
+            matches.append(Student.batch == batch)
+
+        # Two statements, no lookup: counts come from the deletes themselves
+        res = await db.execute(
+            delete(Result).where(Result.student_id.in_(select(Student.id).where(*matches)))
+        )
+        results_count = res.rowcount
+        res = await db.execute(delete(Student).where(*matches))
+        if not res.rowcount:
+            await db.rollback()
             detail = f"Student {usn} not found"
             if batch:
                 detail += f" in batch {batch}"
             raise HTTPException(status_code=404, detail=detail)
 
-        # Count results before deletion
-        results_count = db.query(Result).filter(Result.student_id == student.id).count()
-        db.delete(student)
-
         orphan_counts = {"students_deleted": 0, "subjects_deleted": 0, "semesters_deleted": 0}
         if cleanup_orphans:
-            orphan_counts = _cleanup_orphans(db)
+            orphan_counts = await _cleanup_orphans(db)
 
-        db.commit()
+        await db.commit()
+        _invalidate_meta_cache()
+        _schedule_analytics_refresh()
 
         try:
-            n = _create_notification(
+            n = await _create_notification_async(
                 db,
                 title=f"Admin purge: candidate {usn}",
                 detail=f"Results deleted: {results_count}",
                 level="warning",
             )
-            await notification_manager.broadcast(
-                {
-                    "type": "notification",
-                    "data": {
-                        "id": n.id,
-                        "title": n.title,
-                        "detail": n.detail,
-                        "level": n.level,
-                        "created_at": n.created_at.isoformat() if n.created_at else None,
-                    },
-                }
-            )
+            _broadcast_notification(n)
         except Exception:
             pass
 
@@ -1059,7 +1440,7 @@ async def purge_candidate_records(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1071,7 +1452,7 @@ async def purge_semester_records(
     exam_month: Optional[str] = Query(None, description="Optional exam month filter (e.g., December)"),
     exam_year: Optional[int] = Query(None, description="Optional exam year filter (e.g., 2024)"),
     cleanup_orphans: bool = Query(True),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete all Result rows for a semester number.
 
@@ -1081,53 +1462,38 @@ async def purge_semester_records(
         raise HTTPException(status_code=400, detail="Confirmation required: confirm=DELETE")
 
     try:
-        # Build query for results to delete
-        res_id_query = db.query(Result.id).join(Semester)
-        res_id_query = res_id_query.filter(Semester.semester_number == semester_number)
-        
+        # One DELETE filtered on the FK columns (semi-joins against semesters/students),
+        # rather than re-selecting Result ids
+        semester_ids = select(Semester.id).where(Semester.semester_number == semester_number)
+
         if exam_month:
-            res_id_query = res_id_query.filter(Semester.exam_month == exam_month)
+            semester_ids = semester_ids.where(Semester.exam_month == exam_month)
         if exam_year is not None:
-            res_id_query = res_id_query.filter(Semester.exam_year == exam_year)
-        
+            semester_ids = semester_ids.where(Semester.exam_year == exam_year)
+
+        stmt = delete(Result).where(Result.semester_id.in_(semester_ids))
         if batch:
-            res_id_query = res_id_query.join(Student).filter(Student.batch == batch)
+            stmt = stmt.where(Result.student_id.in_(select(Student.id).where(Student.batch == batch)))
 
-        res_ids = [row[0] for row in res_id_query.all()]
-        
-        results_deleted = 0
-        if res_ids:
-            results_deleted = (
-                db.query(Result)
-                .filter(Result.id.in_(res_ids))
-                .delete(synchronize_session=False)
-            )
+        res = await db.execute(stmt)
+        results_deleted = res.rowcount
 
         orphan_counts = {"students_deleted": 0, "subjects_deleted": 0, "semesters_deleted": 0}
         if cleanup_orphans:
-            orphan_counts = _cleanup_orphans(db)
+            orphan_counts = await _cleanup_orphans(db)
 
-        db.commit()
+        await db.commit()
+        _invalidate_meta_cache()
+        _schedule_analytics_refresh()
 
         try:
-            n = _create_notification(
+            n = await _create_notification_async(
                 db,
                 title=f"Admin purge: semester {semester_number}",
                 detail=f"Results deleted: {results_deleted}",
                 level="warning",
             )
-            await notification_manager.broadcast(
-                {
-                    "type": "notification",
-                    "data": {
-                        "id": n.id,
-                        "title": n.title,
-                        "detail": n.detail,
-                        "level": n.level,
-                        "created_at": n.created_at.isoformat() if n.created_at else None,
-                    },
-                }
-            )
+            _broadcast_notification(n)
         except Exception:
             pass
 
@@ -1142,15 +1508,28 @@ async def purge_semester_records(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _drop_orphan_results_partitions(db: AsyncSession) -> None:
+    """Drop results_sem_<id> partitions whose semester no longer exists (the caller commits)."""
+    if not RESULTS_PARTITIONED:
+        return
+    orphans = (await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'results'::regclass AND c.relname ~ '^results_sem_[0-9]+$' "
+        "AND NOT EXISTS (SELECT 1 FROM semesters s WHERE 'results_sem_' || s.id = c.relname)"
+    ))).scalars().all()
+    for name in orphans:
+        await db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+
+
 @app.delete("/admin/purge/all")
 async def purge_all_records(
     confirm: str = Query(..., description="Type DELETE_ALL to confirm"),
     batch: Optional[str] = Query(None, description="Optional batch filter (e.g., 2022-2026)"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete database records (students, subjects, semesters, results, upload logs)."""
     if confirm.strip().upper() != "DELETE_ALL":
@@ -1158,64 +1537,85 @@ async def purge_all_records(
 
     try:
         if batch:
-            # First, find student IDs in this batch
-            student_ids = [
-                row[0] for row in db.query(Student.id).filter(Student.batch == batch).all()
-            ]
-            
-            results_deleted = 0
-            students_deleted = 0
-            
-            if student_ids:
-                # Delete results for these students (using IN clause, not join)
-                results_deleted = (
-                    db.query(Result)
-                    .filter(Result.student_id.in_(student_ids))
-                    .delete(synchronize_session=False)
-                )
-                # Delete the students themselves
-                students_deleted = (
-                    db.query(Student)
-                    .filter(Student.id.in_(student_ids))
-                    .delete(synchronize_session=False)
+            # Students in this batch (as a subquery, not a materialized id list)
+            batch_student_ids = select(Student.id).where(Student.batch == batch)
+
+            # Delete results for these students, keeping the FKs they referenced
+            deleted = (
+                await db.execute(
+                    delete(Result)
+                    .where(Result.student_id.in_(batch_student_ids))
+                    .returning(Result.subject_id, Result.semester_id)
                 )
-            
+            ).all()
+            results_deleted = len(deleted)
+            res = await db.execute(delete(Student).where(Student.batch == batch))
+            students_deleted = res.rowcount
+
             upload_logs_deleted = 0
-            # Cleanup orphan subjects/semesters
-            orphan_counts = _cleanup_orphans(db)
-            db.commit()
-            
+            # Only subjects/semesters the deleted rows pointed at can have become orphans;
+            # the batch's students are already gone and no other student lost results
+            orphan_counts = await _cleanup_orphans(
+                db,
+                subject_ids={row.subject_id for row in deleted},
+                semester_ids={row.semester_id for row in deleted},
+                student_ids=set(),
+            )
+            await db.commit()
+            # Separate short transaction: dropping a partition locks results exclusively
+            await _drop_orphan_results_partitions(db)
+            await db.commit()
+            _invalidate_meta_cache()
+            _schedule_analytics_refresh()
+
             subjects_deleted = orphan_counts["subjects_deleted"]
             semesters_deleted = orphan_counts["semesters_deleted"]
             students_deleted_actual = orphan_counts["students_deleted"] + students_deleted
+        elif db.get_bind().dialect.name == "postgresql":
+            # One TRUNCATE over the whole FK graph: no per-row deletes and no per-row
+            # FK trigger checks (CASCADE actions can't be deferred, so deferral wouldn't help).
+            # TRUNCATE reports no rowcount, so lock the tables and count first.
+            purged_tables = "results, upload_logs, subjects, semesters, students"
+            await db.execute(text(f"LOCK TABLE {purged_tables} IN ACCESS EXCLUSIVE MODE"))
+            (
+                results_deleted,
+                upload_logs_deleted,
+                subjects_deleted,
+                semesters_deleted,
+                students_deleted_actual,
+            ) = (
+                await db.execute(
+                    select(*(
+                        select(func.count()).select_from(model).scalar_subquery()
+                        for model in (Result, UploadLog, Subject, Semester, Student)
+                    ))
+                )
+            ).one()
+            await db.execute(text(f"TRUNCATE TABLE {purged_tables}"))
+            # Every semester is gone, so are their partitions (results is already locked)
+            await _drop_orphan_results_partitions(db)
+            await db.commit()
+            _invalidate_meta_cache()
+            _schedule_analytics_refresh()
         else:
-            results_deleted = db.query(Result).delete(synchronize_session=False)
-            upload_logs_deleted = db.query(UploadLog).delete(synchronize_session=False)
+            results_deleted = (await db.execute(delete(Result))).rowcount
+            upload_logs_deleted = (await db.execute(delete(UploadLog))).rowcount
             # Parents (no results remain, safe to delete everything)
-            subjects_deleted = db.query(Subject).delete(synchronize_session=False)
-            semesters_deleted = db.query(Semester).delete(synchronize_session=False)
-            students_deleted_actual = db.query(Student).delete(synchronize_session=False)
-            db.commit()
+            subjects_deleted = (await db.execute(delete(Subject))).rowcount
+            semesters_deleted = (await db.execute(delete(Semester))).rowcount
+            students_deleted_actual = (await db.execute(delete(Student))).rowcount
+            await db.commit()
+            _invalidate_meta_cache()
+            _schedule_analytics_refresh()
 
         try:
-            n = _create_notification(
+            n = await _create_notification_async(
                 db,
                 title="Admin purge: " + (f"Batch {batch}" if batch else "ALL records") + " deleted",
                 detail=f"Results: {results_deleted}, Students: {students_deleted_actual}, Subjects: {subjects_deleted}, Semesters: {semesters_deleted}",
                 level="error",
             )
-            await notification_manager.broadcast(
-                {
-                    "type": "notification",
-                    "data": {
-                        "id": n.id,
-                        "title": n.title,
-                        "detail": n.detail,
-                        "level": n.level,
-                        "created_at": n.created_at.isoformat() if n.created_at else None,
-                    },
-                }
-            )
+            _broadcast_notification(n)
         except Exception:
             pass
 
@@ -1228,31 +1628,33 @@ async def purge_all_records(
             "students_deleted": students_deleted_actual,
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.delete("/upload/batch/{batch_id}")
-async def delete_batch(batch_id: str, db: Session = Depends(get_db)):
+async def delete_batch(batch_id: str, db: AsyncSession = Depends(get_async_db)):
     """Delete all results from a specific batch upload"""
     try:
         # Verify batch exists (upload log)
-        upload_log = db.query(UploadLog).filter(UploadLog.batch_id == batch_id).first()
-        if not upload_log:
+        canonical_id = _canonical_batch_id(batch_id)
+        upload_log_id = None
+        if canonical_id is not None:
+            upload_log_id = await db.scalar(select(UploadLog.id).where(UploadLog.batch_id == canonical_id))
+        if upload_log_id is None:
             raise HTTPException(status_code=404, detail="Batch not found")
 
         # Delete all results last written by this upload batch
-        results_deleted = (
-            db.query(Result)
-            .filter(Result.upload_batch_id == batch_id)
-            .delete(synchronize_session=False)
-        )
+        res = await db.execute(delete(Result).where(Result.upload_batch_id == canonical_id))
+        results_deleted = res.rowcount
 
         # Delete the upload log itself
-        db.delete(upload_log)
+        await db.execute(delete(UploadLog).where(UploadLog.id == upload_log_id))
 
-        orphan_counts = _cleanup_orphans(db)
-        db.commit()
+        orphan_counts = await _cleanup_orphans(db)
+        await db.commit()
+        _invalidate_meta_cache()
+        _schedule_analytics_refresh()
 
         return {
             "message": f"Deleted batch {batch_id}",
@@ -1262,7 +1664,7 @@ async def delete_batch(batch_id: str, db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1277,7 +1679,7 @@ def _validate_batch(batch: Optional[str]) -> Optional[str]:
         return None
 
     # Expected format: YYYY-YYYY where end = start + 4 (UG 4-year batches)
-    m = __import__("re").match(r"^(\d{4})-(\d{4})$", normalized)
+    m = _BATCH_RE.match(normalized)
     if not m:
         raise HTTPException(status_code=400, detail="Invalid batch format. Use YYYY-YYYY (e.g., 2022-2026)")
 
@@ -1299,21 +1701,71 @@ def _extract_branch_from_usn(usn: Optional[str]) -> Optional[str]:
     if not usn:
         return None
     val = str(usn).strip().upper()
-    # College code (1 + 2-3 letters), 2-digit admission year, 2-3 letter branch, remaining digits
-    m = __import__("re").match(r"^\d[A-Z]{2,3}\d{2}([A-Z]{2,3})\d{3,}$", val)
+    # Standard 10-character USN: with 10 characters the pattern can only be laid out
+    # as D LL DD LL DDD, so check that with str methods and slice the branch out
+    if len(val) == 10 and val.isascii():
+        if val[0].isdigit() and val[1:3].isalpha() and val[3:5].isdigit() and val[5:7].isalpha() and val[7:].isdigit():
+            return val[5:7]
+        return None
+    m = _USN_BRANCH_RE.match(val)
     if not m:
         return None
     return m.group(1)
 
 
+# Same pattern as _USN_BRANCH_RE, for set-based backfills in SQL
+_USN_BRANCH_PATTERN = _USN_BRANCH_RE.pattern
+
+
+def _backfill_student_branches(engine) -> None:
+    """Fill students.branch from the USN where it is missing."""
+    missing = "(branch IS NULL OR branch = '') AND usn IS NOT NULL"
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            # One UPDATE; substring(... from pattern) returns the capture group
+            conn.execute(
+                text(
+                    "UPDATE students SET branch = substring(upper(trim(usn)) from :pattern) "
+                    f"WHERE {missing} AND upper(trim(usn)) ~ :pattern"
+                ),
+                {"pattern": _USN_BRANCH_PATTERN},
+            )
+            return
+
+        # No regex in SQLite: compute in Python, write back with one executemany
+        rows = conn.execute(text(f"SELECT id, usn FROM students WHERE {missing}")).all()
+        updates = [
+            {"id": row_id, "branch": branch}
+            for row_id, usn in rows
+            if (branch := _extract_branch_from_usn(usn))
+        ]
+        if updates:
+            conn.execute(text("UPDATE students SET branch = :branch WHERE id = :id"), updates)
+
+
 def _create_notification(db: Session, title: str, detail: Optional[str] = None, level: str = "info") -> Notification:
     n = Notification(title=title, detail=detail, level=level, cleared=False)
     db.add(n)
     db.commit()
-    db.refresh(n)
     return n
 
 
+async def _create_notification_async(
+    db: AsyncSession, title: str, detail: Optional[str] = None, level: str = "info"
+) -> Notification:
+    n = Notification(title=title, detail=detail, level=level, cleared=False)
+    db.add(n)
+    await db.commit()
+    return n
+
+
+def _keep_upper_alnum(val: str) -> str:
+    """Drop everything but A-Z0-9 from an upper-cased string."""
+    if val.isascii():
+        return val.translate(_ASCII_NON_ALNUM)
+    return _NON_ALNUM_RE.sub("", val)
+
+
 def _normalize_subject_code(code: Optional[str]) -> Optional[str]:
     if code is None:
         return None
@@ -1321,7 +1773,7 @@ def _normalize_subject_code(code: Optional[str]) -> Optional[str]:
     if not val:
         return None
     # Keep only alphanumerics (VTU codes are typically A-Z0-9)
-    val = __import__("re").sub(r"[^A-Z0-9]", "", val)
+    val = _keep_upper_alnum(val)
     return val or None
 
 
@@ -1332,55 +1784,135 @@ def _normalize_subject_name(name: Optional[str]) -> Optional[str]:
     if not val:
         return None
     # Collapse whitespace and strip odd separators
-    val = __import__("re").sub(r"\s+", " ", val)
+    val = " ".join(val.split())
     return val.strip() or None
 
 
+# Distinct branch/batch lists only change when students are saved or deleted, so
+# they are cached per process. Writers invalidate; the TTL bounds staleness across workers.
+META_CACHE_TTL = float(os.getenv("META_CACHE_TTL", "300"))
+_meta_cache: dict = {}
+
+
+def _meta_cache_get(key: tuple):
+    entry = _meta_cache.get(key)
+    if entry is None or entry[0] < time.monotonic():
+        return None
+    return entry[1]
+
+
+def _meta_cache_set(key: tuple, value: list) -> list:
+    _meta_cache[key] = (time.monotonic() + META_CACHE_TTL, value)
+    return value
+
+
+def _invalidate_meta_cache() -> None:
+    _meta_cache.clear()
+
+
+# Analytics materialized views are refreshed after writes, off the event loop and
+# off the request path. Writes within ANALYTICS_REFRESH_DELAY seconds share one
+# refresh; writes arriving while a refresh runs are folded into one follow-up.
+ANALYTICS_REFRESH_DELAY = float(os.getenv("ANALYTICS_REFRESH_DELAY", "2"))
+_analytics_refresh_task: Optional[asyncio.Task] = None
+_analytics_refresh_pending = False
+_analytics_refresh_lock = asyncio.Lock()
+
+
+def _refresh_analytics_views_sync() -> None:
+    with get_engine().begin() as conn:
+        refresh_analytics_views(conn)
+
+
+async def _refresh_analytics_views_once() -> None:
+    """Run one refresh now (after any in-flight one); used when a batch completes."""
+    global _analytics_refresh_pending
+    if not ResultAnalyzer.use_materialized_views:
+        return
+    async with _analytics_refresh_lock:
+        _analytics_refresh_pending = False
+        try:
+            await anyio.to_thread.run_sync(_refresh_analytics_views_sync)
+        except Exception as e:
+            logger.warning(f"Analytics view refresh failed: {str(e)}")
+
+
+async def _run_analytics_refresh() -> None:
+    while _analytics_refresh_pending:
+        await asyncio.sleep(ANALYTICS_REFRESH_DELAY)
+        # A completing batch may have refreshed in the meantime
+        if _analytics_refresh_pending:
+            await _refresh_analytics_views_once()
+
+
+def _schedule_analytics_refresh() -> None:
+    """Queue a debounced background refresh; callers don't wait for it."""
+    global _analytics_refresh_task, _analytics_refresh_pending
+    if not ResultAnalyzer.use_materialized_views:
+        return
+    _analytics_refresh_pending = True
+    if _analytics_refresh_task is None or _analytics_refresh_task.done():
+        _analytics_refresh_task = asyncio.create_task(_run_analytics_refresh())
+
+
 @app.get("/meta/branches")
-async def get_branches(batch: Optional[str] = None, db: Session = Depends(get_db)):
+async def get_branches(batch: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     """Get distinct branch codes, optionally filtered by batch."""
     normalized_batch = _validate_batch(batch)
-    q = db.query(Student.branch).filter(Student.branch.isnot(None)).filter(Student.branch != "")
+    cached = _meta_cache_get(("branches", normalized_batch))
+    if cached is not None:
+        return cached
+
+    q = select(Student.branch).where(Student.branch.isnot(None)).where(Student.branch != "")
     if normalized_batch:
-        q = q.filter(Student.batch == normalized_batch)
-    rows = q.distinct().order_by(Student.branch.asc()).all()
-    return [r[0] for r in rows if r and r[0]]
+        q = q.where(Student.batch == normalized_batch)
+    branches = (await db.scalars(q.distinct().order_by(Student.branch.asc()))).all()
+    return _meta_cache_set(("branches", normalized_batch), [b for b in branches if b])
 
 
 @app.get("/meta/batches")
-async def get_batches(db: Session = Depends(get_db)):
+async def get_batches(db: AsyncSession = Depends(get_async_db)):
     """Get distinct batches present in the database.
 
     This is the source of truth for UI counts (e.g., 2022-2026 should be one batch).
     """
-    q = db.query(Student.batch).filter(Student.batch.isnot(None)).filter(Student.batch != "")
-    rows = q.distinct().order_by(Student.batch.asc()).all()
-    batches = []
-    for r in rows:
-        if not r or not r[0]:
-            continue
-        val = _validate_batch(str(r[0]))
-        if val:
-            batches.append(val)
-    # Deduplicate after normalization
-    return sorted(set(batches))
+    cached = _meta_cache_get(("batches",))
+    if cached is not None:
+        return cached
+
+    # Stored batches are already normalized by _validate_batch on write, so the
+    # database can filter (YYYY-YYYY, end = start + 4), dedupe and sort them itself
+    if db.get_bind().dialect.name == "postgresql":
+        well_formed = Student.batch.op("~")(r"^[0-9]{4}-[0-9]{4}$")
+    else:
+        well_formed = Student.batch.op("GLOB")("[0-9][0-9][0-9][0-9]-[0-9][0-9][0-9][0-9]")
+    # CASE keeps the casts behind the format check
+    span = case(
+        (well_formed, cast(func.substr(Student.batch, 6, 4), Integer) - cast(func.substr(Student.batch, 1, 4), Integer))
+    )
+    q = select(Student.batch).where(span == 4).distinct().order_by(Student.batch.asc())
+    return _meta_cache_set(("batches",), list((await db.scalars(q)).all()))
 
 
 @app.get("/meta/subjects")
-async def get_subjects(db: Session = Depends(get_db)):
+async def get_subjects(db: AsyncSession = Depends(get_async_db)):
     """Get all distinct subjects (code and name)"""
     subjects = (
-        db.query(Subject.subject_code, Subject.subject_name, Subject.credits)
-        .order_by(Subject.subject_code.asc())
-        .all()
-    )
-    return [{"code": s.subject_code, "name": s.subject_name, "credits": s.credits} for s in subjects]
+        await db.execute(
+            select(
+                Subject.subject_code.label("code"),
+                Subject.subject_name.label("name"),
+                Subject.credits,
+            ).order_by(Subject.subject_code.asc())
+        )
+    ).mappings()
+    return ORJSONResponse([dict(s) for s in subjects])
 
 
 @app.put("/meta/subjects/credits")
 async def update_subject_credits(
     items: List[dict] = Body(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Bulk update credits for subjects.
 
@@ -1390,6 +1922,7 @@ async def update_subject_credits(
     updated = 0
     missing: List[str] = []
     invalid: List[str] = []
+    valid: List[dict] = []
 
     for item in items or []:
         code = str(item.get("code") or "").strip()
@@ -1409,211 +1942,508 @@ async def update_subject_credits(
                 invalid.append(code)
                 continue
 
-        s = db.query(Subject).filter(Subject.subject_code == code).first()
-        if not s:
-            missing.append(code)
-            continue
+        valid.append({"b_code": code, "b_credits": credits})
 
-        s.credits = credits
-        updated += 1
+    if valid:
+        # One lookup for missing codes, then a single executemany UPDATE
+        existing = set(
+            (
+                await db.scalars(
+                    select(Subject.subject_code).where(Subject.subject_code.in_({v["b_code"] for v in valid}))
+                )
+            ).all()
+        )
+        missing = [v["b_code"] for v in valid if v["b_code"] not in existing]
+        valid = [v for v in valid if v["b_code"] in existing]
+        if valid:
+            subjects = Subject.__table__
+            stmt = (
+                update(subjects)
+                .where(subjects.c.subject_code == bindparam("b_code"))
+                .values(credits=bindparam("b_credits"))
+            )
+            await db.execute(stmt, valid)
+        updated = len(valid)
 
-    db.commit()
+    await db.commit()
     return {"updated": updated, "missing": missing, "invalid": invalid}
 
 
+# PostgreSQL builds the whole /notifications payload itself; cast to text so the
+# driver hands back the JSON string instead of decoding it
+_NOTIFICATIONS_JSON_SQL = text(
+    """
+    SELECT coalesce(
+        json_agg(
+            json_build_object(
+                'id', n.id, 'title', n.title, 'detail', n.detail,
+                'level', n.level, 'created_at', n.created_at
+            )
+            ORDER BY n.created_at DESC
+        ),
+        '[]'::json
+    )::text
+    FROM (
+        SELECT id, title, detail, level, created_at
+        FROM notifications
+        WHERE cleared = false
+        ORDER BY created_at DESC
+        LIMIT :limit
+    ) AS n
+    """
+)
+
+
 @app.get("/notifications")
-async def list_notifications(limit: int = Query(50, ge=1, le=200), db: Session = Depends(get_db)):
+async def list_notifications(limit: int = Query(50, ge=1, le=200), db: AsyncSession = Depends(get_async_db)):
+    if db.get_bind().dialect.name == "postgresql":
+        payload = await db.scalar(_NOTIFICATIONS_JSON_SQL, {"limit": limit})
+        return Response(content=payload, media_type="application/json")
+
+    # SQLite stores created_at as text, so format it from the parsed datetimes instead
     rows = (
-        db.query(Notification)
-        .filter(Notification.cleared.is_(False))
-        .order_by(Notification.created_at.desc())
-        .limit(limit)
-        .all()
-    )
-    return [
-        {
-            "id": n.id,
-            "title": n.title,
-            "detail": n.detail,
-            "level": n.level,
-            "created_at": n.created_at.isoformat() if n.created_at else None,
-        }
-        for n in rows
-    ]
+        await db.execute(
+            select(Notification.id, Notification.title, Notification.detail, Notification.level, Notification.created_at)
+            .where(Notification.cleared.is_(False))
+            .order_by(Notification.created_at.desc())
+            .limit(limit)
+        )
+    ).mappings()
+    # Returned as-is so orjson encodes the datetimes, skipping jsonable_encoder
+    return ORJSONResponse([dict(n) for n in rows])
 
 
 @app.delete("/notifications/clear")
-async def clear_notifications(confirm: Optional[str] = None, db: Session = Depends(get_db)):
+async def clear_notifications(confirm: Optional[str] = None, db: AsyncSession = Depends(get_async_db)):
     if (confirm or "").strip().upper() != "CLEAR_ALL":
         raise HTTPException(status_code=400, detail="Type confirm=CLEAR_ALL to clear notifications")
-    updated = (
-        db.query(Notification)
-        .filter(Notification.cleared.is_(False))
-        .update({Notification.cleared: True}, synchronize_session=False)
+    res = await db.execute(
+        update(Notification).where(Notification.cleared.is_(False)).values(cleared=True)
     )
-    db.commit()
+    updated = res.rowcount
+    await db.commit()
     return {"message": "Notifications cleared", "cleared": int(updated or 0)}
 
 
 @app.delete("/notifications/{notification_id}")
-async def clear_notification(notification_id: int, db: Session = Depends(get_db)):
-    n = db.query(Notification).filter(Notification.id == notification_id).first()
-    if not n:
+async def clear_notification(notification_id: int, db: AsyncSession = Depends(get_async_db)):
+    cleared = await db.scalar(select(Notification.cleared).where(Notification.id == notification_id))
+    if cleared is None:
         raise HTTPException(status_code=404, detail="Notification not found")
 
-    if n.cleared:
+    if cleared:
         return {"message": "Notification already cleared", "id": notification_id}
 
-    n.cleared = True
-    db.commit()
+    await db.execute(update(Notification).where(Notification.id == notification_id).values(cleared=True))
+    await db.commit()
     try:
-        await notification_manager.broadcast({"type": "notification_cleared", "id": notification_id})
+        _queue_notification({"type": "notification_cleared", "id": notification_id})
     except Exception:
         pass
     return {"message": "Notification cleared", "id": notification_id}
 
 
-def save_extracted_data(
+def _dialect_insert(db, model):
+    """INSERT construct with ON CONFLICT support for the session's (or connection's) dialect."""
+    dialect = db.get_bind().dialect if isinstance(db, Session) else db.dialect
+    if dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model)
+
+
+def _clean_extracted_subject(subject_data) -> Optional[tuple]:
+    """Normalize subject code/name defensively (protect DB from extraction quirks).
+
+    Returns (code, name) or None when the row has no usable code.
+    """
+    raw_code = str(getattr(subject_data, "subject_code", "") or "").strip().upper()
+    raw_code = _keep_upper_alnum(raw_code)
+
+    if not raw_code:
+        return None
+
+    raw_name = " ".join(str(getattr(subject_data, "subject_name", "") or "").split())
+
+    # Repair common extraction glitch: one stray leading letter glued to a common title word
+    # e.g., "DINTRODUCTION TO ..." -> "INTRODUCTION TO ..."
+    if len(raw_name) >= 10 and _STRAY_LEADING_LETTER_RE.match(raw_name):
+        raw_name = raw_name[1:].lstrip()
+
+    if not raw_name:
+        raw_name = raw_code
+
+    return raw_code, raw_name
+
+
+@lru_cache(maxsize=256)
+def _parse_announced_date(value: str) -> date:
+    """Parse a YYYY-MM-DD announced date; subjects in a batch share a handful of dates."""
+    return date.fromisoformat(value)
+
+
+# Set at startup when results is LIST-partitioned by semester_id (sql/schema.sql or
+# scripts/partition_results.py); each new semester then gets its own partition
+RESULTS_PARTITIONED = False
+
+
+# Longest a partition DDL waits for the results lock before giving up (rows then use results_default)
+PARTITION_LOCK_TIMEOUT = os.getenv("PARTITION_LOCK_TIMEOUT", "5s")
+
+
+def _create_results_partition(semester_id: int) -> None:
+    """Add results_sem_<id> for a new semester in a short transaction of its own.
+
+    Rows fall back to results_default if this fails.
+    """
+    try:
+        with get_engine().begin() as conn:
+            conn.execute(text("SELECT set_config('lock_timeout', :timeout, true)"), {"timeout": PARTITION_LOCK_TIMEOUT})
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS results_sem_{int(semester_id)} "
+                f"PARTITION OF results FOR VALUES IN ({int(semester_id)})"
+            ))
+    except Exception as e:
+        logger.warning(f"Could not create results partition for semester {semester_id}: {str(e)}")
+
+
+def _get_or_create_semesters(conn, missing_terms: Set[tuple], semester_ids: dict) -> List[int]:
+    """Fill semester_ids for missing (number, month, year) terms, inserting unknown ones.
+
+    NULL month/year never conflict on uq_semester_term, so terms are matched in Python.
+    conn is a Session or Connection; returns the ids of newly inserted semesters.
+    """
+    existing = conn.execute(
+        select(Semester.semester_number, Semester.exam_month, Semester.exam_year, Semester.id)
+        .where(Semester.semester_number.in_({term[0] for term in missing_terms}))
+    ).all()
+    for number, month, year, semester_id in existing:
+        if (number, month, year) in missing_terms:
+            semester_ids[(number, month, year)] = semester_id
+    new_terms = missing_terms - semester_ids.keys()
+    if not new_terms:
+        return []
+    stmt = _dialect_insert(conn, Semester).returning(
+        Semester.semester_number, Semester.exam_month, Semester.exam_year, Semester.id
+    )
+    rows = [
+        {"semester_number": number, "exam_month": month, "exam_year": year}
+        for number, month, year in new_terms
+    ]
+    new_ids = []
+    for number, month, year, semester_id in conn.execute(stmt, rows).all():
+        semester_ids[(number, month, year)] = semester_id
+        new_ids.append(semester_id)
+    return new_ids
+
+
+def _marks_in_range(internal: Optional[int], external: Optional[int], total: Optional[int]) -> bool:
+    """Same bounds as the results CHECK constraints; None (not printed) is always allowed."""
+    return (
+        (internal is None or 0 <= internal <= 50)
+        and (external is None or 0 <= external <= 100)
+        and (total is None or 0 <= total <= 200)
+    )
+
+
+# Rows per INSERT ... ON CONFLICT statement in save_extracted_batch
+BULK_INSERT_CHUNK = 10000
+# On PostgreSQL, result batches at least this large are loaded with COPY into a staging table
+COPY_MIN_ROWS = int(os.getenv("COPY_MIN_ROWS", "1000"))
+
+_COPY_RESULT_COLUMNS = (
+    "student_id", "semester_id", "subject_id", "internal_marks", "external_marks",
+    "total_marks", "upload_batch_id", "result_status", "announced_date",
+)
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+# Column types are copied from results, so the staging table tracks the ENUM/SMALLINT migration
+_RESULT_STAGING_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS results_staging ON COMMIT DROP AS
+SELECT {", ".join(_COPY_RESULT_COLUMNS)} FROM results WITH NO DATA
+"""
+_RESULT_MERGE_SQL = f"""
+INSERT INTO results ({", ".join(_COPY_RESULT_COLUMNS)})
+SELECT {", ".join(_COPY_RESULT_COLUMNS)} FROM results_staging
+ON CONFLICT (student_id, semester_id, subject_id) DO UPDATE SET
+    internal_marks = EXCLUDED.internal_marks,
+    external_marks = EXCLUDED.external_marks,
+    total_marks = EXCLUDED.total_marks,
+    result_status = EXCLUDED.result_status,
+    announced_date = COALESCE(EXCLUDED.announced_date, results.announced_date),
+    upload_batch_id = COALESCE(EXCLUDED.upload_batch_id, results.upload_batch_id),
+    updated_at = NOW()
+"""
+
+
+def _copy_field(value) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    return str(value)
+
+
+def _copy_upsert_results(db: Session, rows: List[dict]) -> None:
+    """Stage rows with COPY FROM STDIN, then merge them in one INSERT ... SELECT ... ON CONFLICT.
+
+    Runs on the session's connection, so it shares the caller's transaction.
+    """
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join([_copy_field(row[col]) for col in _COPY_RESULT_COLUMNS]))
+        buf.write("\n")
+    buf.seek(0)
+
+    cursor = db.connection().connection.driver_connection.cursor()
+    try:
+        cursor.execute(_RESULT_STAGING_SQL)
+        cursor.execute("TRUNCATE results_staging")
+        cursor.copy_expert(
+            f"COPY results_staging ({', '.join(_COPY_RESULT_COLUMNS)}) FROM STDIN", buf
+        )
+        cursor.execute(_RESULT_MERGE_SQL)
+    finally:
+        cursor.close()
+
+
+def save_extracted_batch(
     db: Session,
-    data: ExtractedStudentResult,
+    items: List[ExtractedStudentResult],
     batch: Optional[str] = None,
     upload_batch_id: Optional[str] = None,
-) -> dict:
-    """Save extracted PDF data to database"""
+    subject_cache: Optional[dict] = None,
+    semester_cache: Optional[dict] = None,
+    rejected: Optional[List[Tuple[ExtractedStudentResult, str]]] = None,
+) -> List[dict]:
+    """Save many extracted PDFs with set-based upserts instead of per-row ORM work.
+
+    Students, subjects and results are written with INSERT ... ON CONFLICT in
+    a handful of statements regardless of batch size. Semantics match saving
+    the items one by one in order: later items win for marks/status/name,
+    existing batch/branch/credits are kept, and a missing announced date or
+    upload batch id never clears a stored one.
+
+    subject_cache ({code: id}) and semester_cache ({(number, month, year): id})
+    let a caller saving several chunks reuse FK lookups; they are filled in
+    place and cleared if the transaction rolls back.
+
+    Items with out-of-range marks are checked before any SQL runs. With a
+    rejected list they are appended to it as (item, error) and the rest is
+    still saved; without one the first such item raises ValueError.
+    """
+    # Reject out-of-range marks up front, instead of via a CHECK violation mid-upsert
+    valid_items = []
+    for data in items:
+        bad = next(
+            (
+                subject_data for subject_data in data.subjects
+                if not _marks_in_range(subject_data.internal_marks, subject_data.external_marks, subject_data.total_marks)
+            ),
+            None,
+        )
+        if bad is None:
+            valid_items.append(data)
+            continue
+        error = (
+            f"{data.usn} {bad.subject_code}: marks out of range "
+            f"(internal={bad.internal_marks}, external={bad.external_marks}, total={bad.total_marks})"
+        )
+        if rejected is None:
+            raise ValueError(error)
+        rejected.append((data, error))
+    items = valid_items
+
+    if not items:
+        return []
+
     try:
+
         normalized_batch = _validate_batch(batch)
-        extracted_branch = _extract_branch_from_usn(getattr(data, "usn", None))
-        # Get or create student
-        student = db.query(Student).filter(Student.usn == data.usn).first()
-        if not student:
-            student = Student(
-                usn=data.usn,
-                student_name=data.student_name,
-                batch=normalized_batch,
-                branch=extracted_branch,
+
+        # ---- Semesters: few distinct terms per batch; NULL-aware get-or-create.
+        # Resolved before anything else is written (see the partitioned branch).
+        semester_ids = semester_cache if semester_cache is not None else {}
+        missing_terms = {
+            (data.semester, data.exam_month, data.exam_year) for data in items
+        } - semester_ids.keys()
+        if missing_terms:
+            if RESULTS_PARTITIONED:
+                # New semesters need a results partition, and CREATE TABLE ... PARTITION OF
+                # locks results exclusively (and needs locks on the tables its FKs reference).
+                # Inside this transaction that would block every read until the bulk upsert
+                # commits, so semesters and partitions are committed on their own first.
+                with get_engine().begin() as conn:
+                    new_semester_ids = _get_or_create_semesters(conn, missing_terms, semester_ids)
+                for semester_id in new_semester_ids:
+                    _create_results_partition(semester_id)
+            else:
+                _get_or_create_semesters(db, missing_terms, semester_ids)
+
+        # ---- Students: upsert on USN (last name wins, keep existing batch/branch)
+        student_rows = {}
+        for data in items:
+            previous = student_rows.get(data.usn)
+            student_rows[data.usn] = {
+                "usn": data.usn,
+                "student_name": data.student_name or (previous or {}).get("student_name"),
+                "batch": normalized_batch,
+                "branch": _extract_branch_from_usn(getattr(data, "usn", None)),
+            }
+        stmt = _dialect_insert(db, Student)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Student.usn],
+            set_={
+                "student_name": func.coalesce(func.nullif(stmt.excluded.student_name, ""), Student.student_name),
+                "batch": func.coalesce(func.nullif(Student.batch, ""), stmt.excluded.batch, Student.batch),
+                "branch": func.coalesce(func.nullif(Student.branch, ""), stmt.excluded.branch, Student.branch),
+                "updated_at": func.now(),
+            },
+        )
+        # RETURNING hands back ids for inserted and updated rows alike
+        stmt = stmt.returning(Student.usn, Student.id)
+        rows = list(student_rows.values())
+        student_ids = {}
+        for i in range(0, len(rows), BULK_INSERT_CHUNK):
+            student_ids.update(db.execute(stmt, rows[i:i + BULK_INSERT_CHUNK]).all())
+
+        # ---- Subjects: resolve codes against existing rows (+ alt-code fallback)
+        cleaned = []
+        for data in items:
+            subjects = []
+            for subject_data in data.subjects:
+                code_name = _clean_extracted_subject(subject_data)
+                if code_name is not None:
+                    subjects.append((code_name[0], code_name[1], subject_data))
+            cleaned.append(subjects)
+        candidate_codes = set()
+        for subjects in cleaned:
+            for code, _, _ in subjects:
+                candidate_codes.add(code)
+                if len(code) > 1 and code[-1].isalpha():
+                    candidate_codes.add(code[:-1])
+        subject_ids = subject_cache if subject_cache is not None else {}
+        missing_codes = candidate_codes - subject_ids.keys()
+        if missing_codes:
+            subject_ids.update(
+                db.execute(select(Subject.subject_code, Subject.id).where(Subject.subject_code.in_(missing_codes))).all()
             )
-            db.add(student)
-            db.flush()
-        else:
-            # Keep name updated (PDF is source of truth)
-            if data.student_name and student.student_name != data.student_name:
-                student.student_name = data.student_name
-            # Keep existing batch unless it's missing and caller provided one.
-            if normalized_batch and not getattr(student, "batch", None):
-                student.batch = normalized_batch
-            # Backfill branch if missing
-            if extracted_branch and not getattr(student, "branch", None):
-                student.branch = extracted_branch
-
-        # Get or create semester
-        semester = db.query(Semester).filter(
-            Semester.semester_number == data.semester,
-            Semester.exam_month == data.exam_month,
-            Semester.exam_year == data.exam_year
-        ).first()
-        
-        if not semester:
-            semester = Semester(
-                semester_number=data.semester,
-                exam_month=data.exam_month,
-                exam_year=data.exam_year
+        known_codes = set(subject_ids)
+
+        new_subjects = {}
+        for subjects in cleaned:
+            for idx, (code, name, subject_data) in enumerate(subjects):
+                if code not in known_codes:
+                    # If code looks like it accidentally ate the first letter of the
+                    # subject name, try matching without a trailing letter.
+                    alt_code = code[:-1]
+                    if len(code) > 1 and code[-1].isalpha() and alt_code in known_codes:
+                        code = alt_code
+                    else:
+                        new_subjects[code] = {"subject_code": code, "subject_name": name}
+                        known_codes.add(code)
+                subjects[idx] = (code, name, subject_data)
+
+        if new_subjects:
+            stmt = (
+                _dialect_insert(db, Subject)
+                .on_conflict_do_nothing(index_elements=[Subject.subject_code])
+                .returning(Subject.subject_code, Subject.id)
             )
-            db.add(semester)
-            db.flush()
-
-        # Process each subject
-        for subject_data in data.subjects:
-            # Normalize subject code/name defensively (protect DB from extraction quirks)
-            raw_code = str(getattr(subject_data, "subject_code", "") or "").strip().upper()
-            raw_code = __import__("re").sub(r"[^A-Z0-9]", "", raw_code)
-
-            if not raw_code:
-                continue
-
-            raw_name = str(getattr(subject_data, "subject_name", "") or "").strip()
-            raw_name = __import__("re").sub(r"\s+", " ", raw_name)
-
-            # Repair common extraction glitch: one stray leading letter glued to a common title word
-            # e.g., "DINTRODUCTION TO ..." -> "INTRODUCTION TO ..."
-            if len(raw_name) >= 10 and __import__("re").match(
-                r"^[A-Z](INTRODUCTION|PRINCIPLES|FUNDAMENTALS|ENGINEERING|MATHEMATICS|PHYSICS|CHEMISTRY|PROGRAMMING|COMPUTER|DIGITAL|DATA|DESIGN|ANALYSIS|NETWORKS|SYSTEMS|ELECTRONICS)",
-                raw_name,
-                __import__("re").IGNORECASE,
-            ):
-                raw_name = raw_name[1:].lstrip()
-
-            if not raw_name:
-                raw_name = raw_code
-
-            # Get or create subject
-            subject = db.query(Subject).filter(Subject.subject_code == raw_code).first()
-
-            # If code looks like it accidentally ate the first letter of the subject name,
-            # try matching without a trailing letter.
-            if subject is None and len(raw_code) > 1 and raw_code[-1].isalpha():
-                alt_code = raw_code[:-1]
-                alt_subject = db.query(Subject).filter(Subject.subject_code == alt_code).first()
-                if alt_subject is not None:
-                    subject = alt_subject
-                    raw_code = alt_code
-
-            if not subject:
-                subject = Subject(
-                    subject_code=raw_code,
-                    subject_name=raw_name
-                )
-                db.add(subject)
-                db.flush()
-
-            # Create or update result
-            result = db.query(Result).filter(
-                Result.student_id == student.id,
-                Result.semester_id == semester.id,
-                Result.subject_id == subject.id
-            ).first()
-
-            if not result:
-                result = Result(
-                    student_id=student.id,
-                    semester_id=semester.id,
-                    subject_id=subject.id
+            rows = list(new_subjects.values())
+            for i in range(0, len(rows), BULK_INSERT_CHUNK):
+                subject_ids.update(db.execute(stmt, rows[i:i + BULK_INSERT_CHUNK]).all())
+            # Rows skipped by ON CONFLICT (inserted concurrently) return nothing; look those up
+            raced = new_subjects.keys() - subject_ids.keys()
+            if raced:
+                subject_ids.update(
+                    db.execute(select(Subject.subject_code, Subject.id).where(Subject.subject_code.in_(raced))).all()
                 )
-                db.add(result)
-
-            # Update result data
-            result.internal_marks = subject_data.internal_marks
-            result.external_marks = subject_data.external_marks
-            result.total_marks = subject_data.total_marks
-            if upload_batch_id:
-                result.upload_batch_id = upload_batch_id
-            # Normalize result status to single-letter codes stored as strings
-            result.result_status = normalize_result_status(subject_data.result_status)
-            
-            # Parse date
-            if subject_data.announced_date:
-                try:
-                    result.announced_date = datetime.strptime(subject_data.announced_date, '%Y-%m-%d').date()
-                except:
-                    pass
+
+        # ---- Results: one row per (student, semester, subject), later items win
+        result_rows = {}
+        summaries = []
+        for data, subjects in zip(items, cleaned):
+            student_id = student_ids[data.usn]
+            semester_id = semester_ids[(data.semester, data.exam_month, data.exam_year)]
+            for code, _, subject_data in subjects:
+                key = (student_id, semester_id, subject_ids[code])
+                announced = None
+                if subject_data.announced_date:
+                    try:
+                        announced = _parse_announced_date(subject_data.announced_date)
+                    except ValueError:
+                        pass
+                previous = result_rows.get(key)
+                result_rows[key] = {
+                    "student_id": key[0],
+                    "semester_id": key[1],
+                    "subject_id": key[2],
+                    "internal_marks": subject_data.internal_marks,
+                    "external_marks": subject_data.external_marks,
+                    "total_marks": subject_data.total_marks,
+                    # Normalize result status to single-letter codes stored as strings
+                    "result_status": normalize_result_status(subject_data.result_status),
+                    "announced_date": announced or (previous or {}).get("announced_date"),
+                    "upload_batch_id": upload_batch_id or (previous or {}).get("upload_batch_id"),
+                }
+            summaries.append({
+                "student_id": student_id,
+                "semester_id": semester_id,
+                "subjects_processed": len(data.subjects)
+            })
+
+        if len(result_rows) >= COPY_MIN_ROWS and db.get_bind().dialect.name == "postgresql":
+            _copy_upsert_results(db, list(result_rows.values()))
+        elif result_rows:
+            stmt = _dialect_insert(db, Result)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Result.student_id, Result.semester_id, Result.subject_id],
+                set_={
+                    "internal_marks": stmt.excluded.internal_marks,
+                    "external_marks": stmt.excluded.external_marks,
+                    "total_marks": stmt.excluded.total_marks,
+                    "result_status": stmt.excluded.result_status,
+                    "announced_date": func.coalesce(stmt.excluded.announced_date, Result.announced_date),
+                    "upload_batch_id": func.coalesce(stmt.excluded.upload_batch_id, Result.upload_batch_id),
+                    "updated_at": func.now(),
+                },
+            )
+            rows = list(result_rows.values())
+            for i in range(0, len(rows), BULK_INSERT_CHUNK):
+                db.execute(stmt, rows[i:i + BULK_INSERT_CHUNK])
 
         db.commit()
-        
-        return {
-            "student_id": student.id,
-            "semester_id": semester.id,
-            "subjects_processed": len(data.subjects)
-        }
+        _invalidate_meta_cache()
+        return summaries
     except Exception as e:
         db.rollback()
+        # Rows created in the rolled-back transaction are gone; forget their ids
+        for cache in (subject_cache, semester_cache):
+            if cache is not None:
+                cache.clear()
         logger.error(f"Error processing file: {str(e)}")
         raise
 
 
+def save_extracted_data(
+    db: Session,
+    data: ExtractedStudentResult,
+    batch: Optional[str] = None,
+    upload_batch_id: Optional[str] = None,
+) -> dict:
+    """Save extracted PDF data to database"""
+    return save_extracted_batch(db, [data], batch=batch, upload_batch_id=upload_batch_id)[0]
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
         "app.main:app",
         host=os.getenv("API_HOST", "0.0.0.0"),
         port=int(os.getenv("API_PORT", 8000)),
-        reload=os.getenv("API_RELOAD", "True") == "True"
+        reload=os.getenv("API_RELOAD", "True") == "True",
+        # "auto" picks uvloop/httptools (shipped with uvicorn[standard]) when available
+        loop=os.getenv("UVICORN_LOOP", "auto"),
+        http=os.getenv("UVICORN_HTTP", "auto"),
     )
@@ -2,9 +2,10 @@
 SQLAlchemy ORM Models — PostgreSQL
 """
 import enum
+from datetime import date, datetime
+from typing import List, Optional
 
 from sqlalchemy import (
-    Column,
     Integer,
     String,
     DateTime,
@@ -12,11 +13,20 @@ from sqlalchemy import (
     Date,
     Text,
     Boolean,
+    Computed,
     UniqueConstraint,
     CheckConstraint,
+    Index,
+    BigInteger,
+    Column,
+    Enum,
+    SmallInteger,
+    Uuid,
+    MetaData,
+    Table,
 )
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.sql import func, text
 from app.database import Base
 
 
@@ -27,109 +37,276 @@ class UploadStatus(str, enum.Enum):
     FAILED = "FAILED"
 
 
+# Stored result status codes; a native ENUM on PostgreSQL, VARCHAR elsewhere
+RESULT_STATUS_CODES = ("P", "F", "A", "W", "X", "NE")
+
+# Upload batch ids are UUID strings: 16-byte native uuid on PostgreSQL, text elsewhere
+# (existing SQLite files keep their VARCHAR values comparable)
+BatchId = String(50).with_variant(Uuid(as_uuid=False), "postgresql")
+
+# Upload batch id recorded on results saved through /upload/single (the nil UUID)
+SINGLE_UPLOAD_BATCH_ID = "00000000-0000-0000-0000-000000000000"
+
+# Generated expression behind Result.is_pass
+IS_PASS_SQL = "result_status = 'P'"
+
+# Rewrites long-form statuses written by older versions (PASS, FAIL, ...) to codes;
+# anything unrecognised becomes NULL so it can be read through the Enum type
+NORMALIZE_RESULT_STATUS_SQL = f"""
+UPDATE results SET result_status = CASE UPPER(TRIM(result_status))
+    WHEN 'PASS' THEN 'P'
+    WHEN 'FAIL' THEN 'F'
+    WHEN 'ABSENT' THEN 'A'
+    WHEN 'WITHHELD' THEN 'W'
+    WHEN 'NOT_ELIGIBLE_X' THEN 'X'
+    WHEN 'NOT ELIGIBLE X' THEN 'X'
+    WHEN 'NOT_ELIGIBLE_NE' THEN 'NE'
+    WHEN 'NOT ELIGIBLE NE' THEN 'NE'
+    {" ".join(f"WHEN '{code}' THEN '{code}'" for code in RESULT_STATUS_CODES)}
+    ELSE NULL
+END
+WHERE result_status NOT IN ({", ".join(f"'{code}'" for code in RESULT_STATUS_CODES)})
+"""
+
+
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (
+        # Batch-wise dashboards filter on batch and usually branch too
+        Index("ix_students_batch_branch", "batch", "branch"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    usn = Column(String(20), unique=True, nullable=False, index=True)
-    student_name = Column(String(255), nullable=False, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True, init=False)
+    usn: Mapped[str] = mapped_column(String(20), unique=True, nullable=False, index=True)
+    student_name: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
     # Cohort/batch selection in UI (e.g. "2022-2026")
-    batch = Column(String(9), index=True, nullable=True)
+    batch: Mapped[Optional[str]] = mapped_column(String(9), index=True, nullable=True, default=None)
     # Branch extracted from USN (e.g. "1SV22AD005" -> "AD")
-    branch = Column(String(10), index=True, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    branch: Mapped[Optional[str]] = mapped_column(String(10), index=True, nullable=True, default=None)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), init=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), init=False)
 
     # Relationships
-    results = relationship("Result", back_populates="student", cascade="all, delete-orphan")
+    results: Mapped[List["Result"]] = relationship(
+        back_populates="student", passive_deletes=True, lazy="raise_on_sql", init=False, repr=False
+    )
 
 
 class Semester(Base):
     __tablename__ = "semesters"
     __table_args__ = (
         UniqueConstraint("semester_number", "exam_month", "exam_year", name="uq_semester_term"),
+        # Term filters (exam_year/exam_month) on results and analytics endpoints
+        Index("ix_semesters_year_month_num", "exam_year", "exam_month", "semester_number"),
     )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    semester_number = Column(Integer, nullable=False, index=True)
-    exam_month = Column(String(50))
-    exam_year = Column(Integer)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True, init=False)
+    semester_number: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    exam_month: Mapped[Optional[str]] = mapped_column(String(50), default=None)
+    exam_year: Mapped[Optional[int]] = mapped_column(Integer, default=None)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), init=False)
 
     # Relationships
-    results = relationship("Result", back_populates="semester", cascade="all, delete-orphan")
+    results: Mapped[List["Result"]] = relationship(
+        back_populates="semester", passive_deletes=True, lazy="raise_on_sql", init=False, repr=False
+    )
 
 
 class Subject(Base):
     __tablename__ = "subjects"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    subject_code = Column(String(20), unique=True, nullable=False, index=True)
-    subject_name = Column(String(500), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True, init=False)
+    subject_code: Mapped[str] = mapped_column(String(20), unique=True, nullable=False, index=True)
+    subject_name: Mapped[str] = mapped_column(String(500), nullable=False)
     # CBCS credit value for GPA calculations. Use 0 for mandatory non-credit courses.
-    credits = Column(Integer, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    credits: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, default=None)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), init=False)
 
     # Relationships
-    results = relationship("Result", back_populates="subject", cascade="all, delete-orphan")
+    results: Mapped[List["Result"]] = relationship(
+        back_populates="subject", passive_deletes=True, lazy="raise_on_sql", init=False, repr=False
+    )
 
 
 class Result(Base):
     __tablename__ = "results"
     __table_args__ = (
+        # Also the ON CONFLICT target for the bulk result upsert in save_extracted_batch
         UniqueConstraint("student_id", "semester_id", "subject_id", name="uq_result_student_sem_subject"),
         CheckConstraint("internal_marks IS NULL OR (internal_marks >= 0 AND internal_marks <= 50)", name="ck_internal_marks_range"),
         CheckConstraint("external_marks IS NULL OR (external_marks >= 0 AND external_marks <= 100)", name="ck_external_marks_range"),
         CheckConstraint("total_marks IS NULL OR (total_marks >= 0 AND total_marks <= 200)", name="ck_total_marks_range"),
+        # Per-semester subject statistics: index-only scans on PostgreSQL (INCLUDE is ignored elsewhere)
+        Index(
+            "ix_results_stats_cover",
+            "semester_id",
+            "subject_id",
+            "result_status",
+            postgresql_include=["internal_marks", "external_marks", "total_marks"],
+        ),
+        # Failure analytics only touch the non-pass minority, so index just those rows
+        Index(
+            "ix_results_nonpass",
+            "semester_id",
+            "subject_id",
+            postgresql_where=text("result_status <> 'P'"),
+            sqlite_where=text("result_status <> 'P'"),
+        ),
+        # Append-only ingest keeps these timestamps correlated with heap order, so a
+        # BRIN block-range summary serves time-range audits at a fraction of a BTree's size
+        Index("ix_results_created_brin", "created_at", postgresql_using="brin").ddl_if(dialect="postgresql"),
+        Index("ix_results_announced_brin", "announced_date", postgresql_using="brin").ddl_if(dialect="postgresql"),
     )
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False, index=True)
-    semester_id = Column(Integer, ForeignKey("semesters.id", ondelete="CASCADE"), nullable=False, index=True)
-    subject_id = Column(Integer, ForeignKey("subjects.id", ondelete="CASCADE"), nullable=False, index=True)
-    internal_marks = Column(Integer)
-    external_marks = Column(Integer)
-    total_marks = Column(Integer)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True, init=False)
+    # student_id lookups use uq_result_student_sem_subject and semester_id lookups
+    # ix_results_stats_cover (both lead with the column); subject_id has no such prefix
+    student_id: Mapped[int] = mapped_column(Integer, ForeignKey("students.id", ondelete="CASCADE"), nullable=False)
+    semester_id: Mapped[int] = mapped_column(Integer, ForeignKey("semesters.id", ondelete="CASCADE"), nullable=False)
+    subject_id: Mapped[int] = mapped_column(Integer, ForeignKey("subjects.id", ondelete="CASCADE"), nullable=False, index=True)
+    internal_marks: Mapped[Optional[int]] = mapped_column(SmallInteger, default=None)
+    external_marks: Mapped[Optional[int]] = mapped_column(SmallInteger, default=None)
+    total_marks: Mapped[Optional[int]] = mapped_column(SmallInteger, default=None)
     # UUID for the upload batch that last wrote this row (used for batch-level deletes/auditing)
-    upload_batch_id = Column(String(50), index=True, nullable=True)
+    upload_batch_id: Mapped[Optional[str]] = mapped_column(BatchId, index=True, nullable=True, default=None)
     # Store single-letter/short codes (P/F/A/W/X/NE)
-    result_status = Column(String(4), index=True)
-    announced_date = Column(Date)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    result_status: Mapped[Optional[str]] = mapped_column(
+        Enum(*RESULT_STATUS_CODES, name="result_status_enum"), default=None
+    )
+    announced_date: Mapped[Optional[date]] = mapped_column(Date, default=None)
+    # Precomputed pass flag so pass counts aggregate a boolean instead of comparing strings
+    is_pass: Mapped[Optional[bool]] = mapped_column(Boolean, Computed(IS_PASS_SQL, persisted=True), init=False)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), init=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), init=False)
 
-    # Relationships
-    student = relationship("Student", back_populates="results")
-    semester = relationship("Semester", back_populates="results")
-    subject = relationship("Subject", back_populates="results")
+    # Relationships. Lazy loads raise instead of issuing one SELECT per row: callers
+    # building ResultDetail must eager-load (selectinload) student/semester/subject.
+    student: Mapped["Student"] = relationship(back_populates="results", lazy="raise_on_sql", init=False, repr=False)
+    semester: Mapped["Semester"] = relationship(back_populates="results", lazy="raise_on_sql", init=False, repr=False)
+    subject: Mapped["Subject"] = relationship(back_populates="results", lazy="raise_on_sql", init=False, repr=False)
 
 
 class UploadLog(Base):
     __tablename__ = "upload_logs"
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    batch_id = Column(String(50), unique=True, nullable=False, index=True)
-    total_files = Column(Integer, default=0)
-    processed_files = Column(Integer, default=0)
-    failed_files = Column(Integer, default=0)
-    current_file = Column(String(255), nullable=True)  # Currently processing file
-    current_file_index = Column(Integer, default=0)  # Index of current file
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True, init=False)
+    batch_id: Mapped[str] = mapped_column(BatchId, unique=True, nullable=False, index=True)
+    total_files: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    processed_files: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    failed_files: Mapped[Optional[int]] = mapped_column(Integer, default=0)
+    current_file: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, default=None)  # Currently processing file
+    current_file_index: Mapped[Optional[int]] = mapped_column(Integer, default=0)  # Index of current file
     # Using String instead of DB-level ENUM for cross-database portability
-    status = Column(String(20), default=UploadStatus.PENDING.value, index=True)
-    error_log = Column(Text)
-    upload_timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    completed_timestamp = Column(DateTime(timezone=True))
+    status: Mapped[Optional[str]] = mapped_column(String(20), default=UploadStatus.PENDING.value, index=True)
+    error_log: Mapped[Optional[str]] = mapped_column(Text, default=None)
+    # B-tree: "latest uploads" is ORDER BY upload_timestamp DESC LIMIT n, which a BRIN can't serve
+    upload_timestamp: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True, init=False
+    )
+    completed_timestamp: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), default=None)
 
 
 class Notification(Base):
     __tablename__ = "notifications"
+    # created_at is returned to the caller right after the insert: fetch it in the
+    # same INSERT ... RETURNING rather than a follow-up SELECT
+    __mapper_args__ = {"eager_defaults": True}
 
-    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True, init=False)
     # Short, human-friendly title
-    title = Column(String(255), nullable=False)
+    title: Mapped[str] = mapped_column(String(255), nullable=False)
     # Optional detail payload for debugging / UI display
-    detail = Column(Text, nullable=True)
+    detail: Mapped[Optional[str]] = mapped_column(Text, nullable=True, default=None)
     # info | success | warning | error
-    level = Column(String(20), nullable=False, index=True, default="info")
-    cleared = Column(Boolean, nullable=False, default=False, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    level: Mapped[str] = mapped_column(String(20), nullable=False, index=True, default="info")
+    cleared: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, index=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True, init=False)
+
+
+# ============================================
+# Analytics materialized views (PostgreSQL only)
+# ============================================
+# Read-only Core tables on their own MetaData so create_all never tries to build
+# them; the DDL below is applied at startup and they are refreshed after uploads.
+# Marks are stored as SUM/COUNT pairs so filtered reads can re-aggregate averages.
+view_metadata = MetaData()
+
+subject_statistics_mv = Table(
+    "mv_subject_statistics",
+    view_metadata,
+    Column("subject_id", Integer),
+    Column("semester_id", Integer),
+    Column("batch", String(9)),
+    Column("branch", String(10)),
+    Column("total_students", BigInteger),
+    Column("sum_internal", BigInteger),
+    Column("n_internal", BigInteger),
+    Column("sum_external", BigInteger),
+    Column("n_external", BigInteger),
+    Column("sum_total", BigInteger),
+    Column("n_total", BigInteger),
+    Column("max_marks", Integer),
+    Column("min_marks", Integer),
+    Column("pass_count", BigInteger),
+    Column("fail_count", BigInteger),
+    # Lowest result id, so filtered reads can list subjects in first-seen (ingest) order
+    Column("first_result_id", Integer),
+)
+
+semester_summary_mv = Table(
+    "mv_semester_summary",
+    view_metadata,
+    Column("student_id", Integer),
+    Column("semester_id", Integer),
+    Column("total_subjects", BigInteger),
+    Column("subjects_passed", BigInteger),
+    Column("subjects_failed", BigInteger),
+    Column("sum_total", BigInteger),
+    Column("n_total", BigInteger),
+    Column("highest_marks", Integer),
+    Column("lowest_marks", Integer),
+)
+
+# batch/branch are COALESCEd so the unique index (needed for REFRESH ... CONCURRENTLY) has no NULL keys
+ANALYTICS_VIEW_DDL = (
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS mv_subject_statistics AS
+    SELECT r.subject_id,
+           r.semester_id,
+           COALESCE(st.batch, '') AS batch,
+           COALESCE(st.branch, '') AS branch,
+           COUNT(*) AS total_students,
+           SUM(r.internal_marks) AS sum_internal,
+           COUNT(r.internal_marks) AS n_internal,
+           SUM(r.external_marks) AS sum_external,
+           COUNT(r.external_marks) AS n_external,
+           SUM(r.total_marks) AS sum_total,
+           COUNT(r.total_marks) AS n_total,
+           MAX(r.total_marks) AS max_marks,
+           MIN(r.total_marks) AS min_marks,
+           COUNT(*) FILTER (WHERE r.is_pass) AS pass_count,
+           COUNT(*) FILTER (WHERE r.result_status = 'F') AS fail_count,
+           MIN(r.id) AS first_result_id
+    FROM results r
+    JOIN students st ON st.id = r.student_id
+    GROUP BY r.subject_id, r.semester_id, COALESCE(st.batch, ''), COALESCE(st.branch, '')
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_subject_statistics "
+    "ON mv_subject_statistics (subject_id, semester_id, batch, branch)",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS mv_semester_summary AS
+    SELECT r.student_id,
+           r.semester_id,
+           COUNT(*) AS total_subjects,
+           COUNT(*) FILTER (WHERE r.is_pass) AS subjects_passed,
+           COUNT(*) FILTER (WHERE r.result_status = 'F') AS subjects_failed,
+           SUM(r.total_marks) AS sum_total,
+           COUNT(r.total_marks) AS n_total,
+           MAX(r.total_marks) AS highest_marks,
+           MIN(r.total_marks) AS lowest_marks
+    FROM results r
+    GROUP BY r.student_id, r.semester_id
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_semester_summary "
+    "ON mv_semester_summary (student_id, semester_id)",
+)
@@ -1,8 +1,14 @@
 """
 Pydantic schemas for request/response validation
+
+Trust boundary: ingress data (PDF extraction, request bodies) is always
+validated. ORM rows were validated on the way in, so *Response models
+can be built from them with from_orm_trusted(), which skips validation
+(model_construct) and only copies the declared fields.
 """
-from pydantic import BaseModel, Field, field_validator
-from typing import Optional, List
+from functools import lru_cache
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from typing import Any, Callable, Dict, Optional, List, Tuple, get_args
 from datetime import date, datetime
 from enum import Enum
 
@@ -23,6 +29,39 @@ class UploadStatusEnum(str, Enum):
     FAILED = "failed"
 
 
+# Per-model (field name, converter) lists used by from_orm_trusted
+_TRUSTED_PLANS: Dict[type, List[Tuple[str, Optional[Callable[[Any], Any]]]]] = {}
+
+
+def _trusted_converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Nested response models are built recursively; enum fields get their enum member."""
+    for tp in get_args(annotation) or (annotation,):
+        if isinstance(tp, type):
+            if issubclass(tp, TrustedORMMixin):
+                return tp.from_orm_trusted
+            if issubclass(tp, Enum):
+                return tp
+    return None
+
+
+class TrustedORMMixin:
+    """Build a response model from an already-validated ORM object without re-validating it."""
+
+    @classmethod
+    def from_orm_trusted(cls, obj: Any):
+        plan = _TRUSTED_PLANS.get(cls)
+        if plan is None:
+            plan = [(name, _trusted_converter(field.annotation)) for name, field in cls.model_fields.items()]
+            _TRUSTED_PLANS[cls] = plan
+        values = {}
+        for name, convert in plan:
+            value = getattr(obj, name)
+            if convert is not None and value is not None:
+                value = convert(value)
+            values[name] = value
+        return cls.model_construct(**values)
+
+
 # Subject Schemas
 class SubjectBase(BaseModel):
     subject_code: str = Field(..., max_length=20)
@@ -33,7 +72,7 @@ class SubjectCreate(SubjectBase):
     pass
 
 
-class SubjectResponse(SubjectBase):
+class SubjectResponse(TrustedORMMixin, SubjectBase):
     id: int
     created_at: datetime
 
@@ -53,7 +92,7 @@ class StudentCreate(StudentBase):
     pass
 
 
-class StudentResponse(StudentBase):
+class StudentResponse(TrustedORMMixin, StudentBase):
     id: int
     created_at: datetime
     updated_at: datetime
@@ -73,7 +112,7 @@ class SemesterCreate(SemesterBase):
     pass
 
 
-class SemesterResponse(SemesterBase):
+class SemesterResponse(TrustedORMMixin, SemesterBase):
     id: int
     created_at: datetime
 
@@ -96,7 +135,7 @@ class ResultCreate(ResultBase):
     subject_id: int
 
 
-class ResultResponse(ResultBase):
+class ResultResponse(TrustedORMMixin, ResultBase):
     id: int
     student_id: int
     semester_id: int
@@ -108,7 +147,7 @@ class ResultResponse(ResultBase):
         from_attributes = True
 
 
-class ResultDetail(ResultBase):
+class ResultDetail(TrustedORMMixin, ResultBase):
     id: int
     student: StudentResponse
     semester: SemesterResponse
@@ -145,7 +184,7 @@ class UploadLogCreate(BaseModel):
     total_files: int
 
 
-class UploadLogResponse(BaseModel):
+class UploadLogResponse(TrustedORMMixin, BaseModel):
     id: int
     batch_id: str
     total_files: int
@@ -202,3 +241,18 @@ class BatchUploadResponse(BaseModel):
     processed: int
     failed: int
     errors: List[str] = []
+
+
+# Cached list adapters: the core schema/serializer is built once per type, and
+# dump_json() writes JSON bytes in pydantic-core without an intermediate dict pass
+@lru_cache(maxsize=64)
+def list_adapter(tp: type) -> TypeAdapter:
+    return TypeAdapter(List[tp])
+
+
+# Extractor output is validated in one call per PDF (student + nested subjects)
+EXTRACTED_STUDENT_TA = TypeAdapter(ExtractedStudentResult)
+
+STUDENT_LIST_TA = list_adapter(StudentResponse)
+SUBJECT_STATS_LIST_TA = list_adapter(SubjectStatistics)
+SEMESTER_SUMMARY_LIST_TA = list_adapter(SemesterSummary)
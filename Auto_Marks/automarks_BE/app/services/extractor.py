@@ -2,14 +2,19 @@
 PDF Extraction Service using Docling
 Extracts VTU results from PDF files
 """
+import io
 import re
-import json
+import multiprocessing
 import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
+from functools import lru_cache
+from itertools import chain
 from pypdf import PdfReader
-from app.schemas import ExtractedStudentResult, ExtractedSubjectResult
+from app.schemas import EXTRACTED_STUDENT_TA, ExtractedStudentResult
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -23,8 +28,170 @@ try:  # Optional dependency path
 except Exception:  # noqa: BLE001
     _docling_available = False
 
+# PyMuPDF (MuPDF C library) is much faster than pypdf for text extraction. It is
+# AGPL-licensed, so it is not a pinned requirement; install it separately to use it.
+try:  # Optional dependency path
+    import fitz  # PyMuPDF
+
+    _pymupdf_available = True
+except Exception:  # noqa: BLE001
+    _pymupdf_available = False
+
+# pypdfium2 (PDFium, permissively licensed) is the next fastest option when PyMuPDF
+# (AGPL) is not installed; install it separately to use it.
+try:  # Optional dependency path
+    import pypdfium2 as pdfium
+
+    _pdfium_available = True
+except Exception:  # noqa: BLE001
+    _pdfium_available = False
+
+# PDFium is not thread-safe; single uploads extract on the threadpool
+_pdfium_lock = threading.Lock()
+
 # Toggle Docling via environment to avoid slow, model-download path when not desired.
 USE_DOCLING = os.getenv("USE_DOCLING", "false").lower() in {"1", "true", "yes"}
+# PyMuPDF is used whenever installed; set USE_PYMUPDF=false to force pypdf.
+USE_PYMUPDF = os.getenv("USE_PYMUPDF", "true").lower() in {"1", "true", "yes"}
+# Same for pypdfium2 (tried after PyMuPDF); set USE_PDFIUM=false to skip it.
+USE_PDFIUM = os.getenv("USE_PDFIUM", "true").lower() in {"1", "true", "yes"}
+
+
+@lru_cache(maxsize=1)
+def _get_docling_converter():
+    """One DocumentConverter per process; building it loads the layout/table models."""
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import PdfPipelineOptions, TableFormerMode
+    from docling.document_converter import PdfFormatOption
+
+    # VTU result PDFs carry a text layer, so OCR is wasted work; the fast table
+    # model is enough for their single marks table. DOCLING_ARTIFACTS (set by
+    # run_api.py's prefetch) points at predownloaded models.
+    pipeline_options = PdfPipelineOptions(do_ocr=False, artifacts_path=os.getenv("DOCLING_ARTIFACTS") or None)
+    pipeline_options.table_structure_options.mode = TableFormerMode.FAST
+    return DocumentConverter(format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)})
+
+
+# batch_extract runs batches up to this size serially; pool start-up would cost more
+_SERIAL_BATCH_MAX = 9
+
+# Words whose vertical centres are this close (PDF points) belong to one table row
+_ROW_TOLERANCE = 3.0
+
+# Header patterns, compiled once rather than per parsed document
+_USN_LABEL_RE = re.compile(r'(?:University Seat Number|USN)\s*[:\.]?\s*([A-Z0-9]{10})', re.IGNORECASE)
+_USN_BARE_RE = re.compile(r'\b([1-4][A-Z]{2}\d{2}[A-Z]{2}\d{3})\b')
+_NAME_RE = re.compile(r'(?:Student Name|Name)\s*[:\.]?\s*([A-Za-z\s\.]+)(?:\n|Semester)', re.IGNORECASE)
+_SEMESTER_RE = re.compile(r'Semester\s*[:\.]?\s*(\d+)', re.IGNORECASE)
+# A match can only start at the beginning of a letter run, and the runs never need to give
+# letters back, so the lookbehind and possessive runs find the same leftmost match without
+# retrying every split of every word on the page (it scans far past the header otherwise)
+_EXAM_PERIOD_RE = re.compile(r'(?<![A-Za-z])([A-Za-z]++)(?:-|/)?([A-Za-z]++)?\s*[-–]\s*(\d{4})', re.IGNORECASE)
+_EXAM_MONTH_YEAR_RE = re.compile(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s*[-–]\s*(\d{4})', re.IGNORECASE)
+
+# Subject-table patterns, used for every line of every document. They stay str patterns:
+# bytes versions matched a subject line ~15% faster, but names, noise checks and the
+# validated result are all str (decoding captures gives most of that back), and bytes
+# \s drops the \x1c-\x1f separators str \s matches, which extracted text can contain.
+# VTU status codes can be more than just P/F
+_MARKS_RE = re.compile(
+    r"(\d{1,3})\s+(\d{1,3})\s+(\d{1,3})\s+(P|F|A|W|X|NE)\s+(\d{4}-\d{2}-\d{2})"
+)
+# Subject code appears at the start of a line.
+# IMPORTANT: Some PDFs glue code+name without a space (e.g., "BPHYS102PHYSICS...").
+# In that case, we must NOT consume the first letter of the subject name as a code suffix.
+# Only treat a trailing letter as part of the subject code if it's followed by whitespace/end.
+# The marks row is usually on the same line, so one match covers both: groups 2-7 are
+# the name and marks when it is, otherwise group 8 is the rest of the line.
+_SUBJECT_LINE_RE = re.compile(r"^([A-Z]{3,6}\d{3}(?:[A-Z](?=\s|$))?)\s*(?:(.*?)" + _MARKS_RE.pattern + r"|(.*)$)")
+_STRAY_LEADING_LETTER_RE = re.compile(r"^[A-Z](INTRODUCTION|PRINCIPLES|FUNDAMENTALS)", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-zA-Z]+")
+# Table header fragments that sometimes repeat in extracted text
+_HEADER_TOKENS = frozenset({
+    "subject",
+    "code",
+    "subject name",
+    "internal",
+    "external",
+    "marks",
+    "total",
+    "result",
+    "announced",
+    "updated",
+    "on",
+})
+
+
+def _search_pages(pattern: "re.Pattern[str]", pages: List[str]) -> Optional["re.Match[str]"]:
+    """First match of pattern, page by page (header fields sit on the first page)."""
+    for page in pages:
+        match = pattern.search(page)
+        if match:
+            return match
+    return None
+
+
+# Subject names and table fragments repeat across every PDF of a batch, so both
+# line helpers are memoized per process
+@lru_cache(maxsize=2048)
+def _clean_subject_name(name: str) -> str:
+    # Strips the name itself, so callers pass raw slices. split()/join collapses
+    # whitespace runs exactly like re.sub(r"\s+", " ", name.strip()), without the regex.
+    n = " ".join((name or "").split())
+    # Heuristic: some PDFs leak a stray leading letter into the subject name
+    # e.g. "DINTRODUCTION TO ..." -> "INTRODUCTION TO ..."
+    if len(n) >= 12 and _STRAY_LEADING_LETTER_RE.match(n):
+        n = n[1:].lstrip()
+    return n
+
+
+@lru_cache(maxsize=2048)
+def _is_noise_line(text: str) -> bool:
+    # Callers pass lines that are already stripped
+    lowered = text.lower()
+    if not lowered:
+        return True
+    if "nomenclature" in lowered or "abbreviations" in lowered or lowered.startswith("note"):
+        return True
+    if lowered.startswith("results of") or "registrar" in lowered or "sd/" in lowered:
+        return True
+    # If the line is basically only header words, ignore it
+    words = _WORD_RE.findall(lowered)
+    return bool(words) and _HEADER_TOKENS.issuperset(words)
+
+
+def _subject_row(subject_code: str, subject_name: str, marks: tuple) -> dict:
+    """Subject dict from the five _MARKS_RE groups (internal, external, total, status, date)."""
+    internal, external, total, result_status, announced_date = marks
+    internal_marks = int(internal)
+    external_marks = int(external)
+    return {
+        "subject_code": subject_code,
+        "subject_name": subject_name,
+        "internal_marks": internal_marks if internal_marks != 0 else None,
+        "external_marks": external_marks if external_marks != 0 else None,
+        "total_marks": int(total),
+        "result_status": result_status,
+        "announced_date": announced_date,
+    }
+
+
+def _pymupdf_page_lines(page) -> List[str]:
+    """
+    Rebuild visual rows from PyMuPDF word boxes (sorted by y, then x).
+    VTU marks tables put each cell in its own block, so plain block text would
+    split a subject row across lines; grouping words by baseline keeps the
+    "CODE NAME INT EXT TOTAL RESULT DATE" row together like pypdf does.
+    """
+    rows: List[List[tuple]] = []
+    last_y = None
+    for x0, y0, x1, y1, word, *_ in sorted(page.get_text("words"), key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        y = (y0 + y1) / 2
+        if last_y is None or abs(y - last_y) > _ROW_TOLERANCE:
+            rows.append([])
+            last_y = y
+        rows[-1].append((x0, word))
+    return [" ".join(word for _, word in sorted(row)) for row in rows]
 
 
 class VTUResultExtractor:
@@ -46,36 +213,72 @@ class VTUResultExtractor:
         Returns:
             ExtractedStudentResult object or None if extraction fails
         """
+        return self._extract(pdf_path, pdf_path)
+
+    def extract_from_bytes(self, data: bytes, name: str = "upload.pdf") -> Optional[ExtractedStudentResult]:
+        """
+        Extract VTU result data from an in-memory PDF (no temp file)
+
+        Args:
+            data: Raw PDF bytes
+            name: Label used in log messages
+
+        Returns:
+            ExtractedStudentResult object or None if extraction fails
+        """
+        return self._extract(data, name)
+
+    def _extract(self, source: Union[str, bytes], pdf_path: str) -> Optional[ExtractedStudentResult]:
+        """Shared extraction pipeline; source is a file path or raw PDF bytes."""
         try:
             logger.info(f"Processing PDF: {pdf_path}")
 
-            markdown_content = None
+            # Text per page; header fields and subject rows are read page by page
+            pages = None
 
             # Prefer Docling if allowed; otherwise stay lightweight
             if _docling_available and USE_DOCLING:
                 try:
-                    converter = DocumentConverter()
-                    doc = converter.convert(pdf_path)
-                    markdown_content = doc.document.export_to_markdown()
+                    converter = _get_docling_converter()
+                    if isinstance(source, bytes):
+                        from docling.datamodel.base_models import DocumentStream
+
+                        doc = converter.convert(DocumentStream(name=pdf_path, stream=io.BytesIO(source)))
+                    else:
+                        doc = converter.convert(source)
+                    pages = [doc.document.export_to_markdown()]
                     logger.info("Docling extraction succeeded")
                 except Exception as doc_err:  # noqa: BLE001
                     logger.warning(f"Docling extraction failed, falling back to pypdf: {doc_err}")
             elif _docling_available and not USE_DOCLING:
                 logger.info("Docling available but disabled via USE_DOCLING; using pypdf")
 
+            # Fast path: PyMuPDF
+            if pages is None and _pymupdf_available and USE_PYMUPDF:
+                try:
+                    pages = self._read_text_pymupdf(source)
+                except Exception as mu_err:  # noqa: BLE001
+                    logger.warning(f"PyMuPDF extraction failed, falling back to pypdf: {mu_err}")
+
+            # Next: pypdfium2
+            if pages is None and _pdfium_available and USE_PDFIUM:
+                try:
+                    pages = self._read_text_pdfium(source)
+                except Exception as pdfium_err:  # noqa: BLE001
+                    logger.warning(f"pypdfium2 extraction failed, falling back to pypdf: {pdfium_err}")
+
             # Fallback to lightweight pypdf
-            if markdown_content is None:
-                reader = PdfReader(pdf_path)
-                text_chunks: List[str] = []
+            if pages is None:
+                reader = PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+                pages = []
                 for page in reader.pages:
                     try:
-                        text_chunks.append(page.extract_text() or "")
+                        pages.append(page.extract_text() or "")
                     except Exception as page_err:  # noqa: BLE001
                         logger.warning(f"Failed to read a page: {page_err}")
-                markdown_content = "\n".join(text_chunks)
             
             # Extract structured data from text
-            extracted_data = self._parse_markdown_content(markdown_content)
+            extracted_data = self._parse_markdown_content(pages)
             
             if extracted_data:
                 logger.info(f"Successfully extracted data for USN: {extracted_data.usn}")
@@ -88,36 +291,62 @@ class VTUResultExtractor:
             logger.error(f"Error extracting from {pdf_path}: {str(e)}")
             return None
 
-    def _parse_markdown_content(self, content: str) -> Optional[ExtractedStudentResult]:
+    def _read_text_pymupdf(self, source: Union[str, bytes]) -> List[str]:
+        """Row-ordered text of each page via PyMuPDF."""
+        doc = fitz.open(stream=source, filetype="pdf") if isinstance(source, bytes) else fitz.open(source)
+        try:
+            return ["\n".join(_pymupdf_page_lines(page)) for page in doc]
+        finally:
+            doc.close()
+
+    def _read_text_pdfium(self, source: Union[str, bytes]) -> List[str]:
+        """Text of each page via pypdfium2 (content-stream order, like pypdf)."""
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(source)
+            try:
+                pages: List[str] = []
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    try:
+                        # PDFium separates lines with CRLF
+                        pages.append(textpage.get_text_range().replace("\r\n", "\n"))
+                    finally:
+                        textpage.close()
+                        page.close()
+                return pages
+            finally:
+                pdf.close()
+
+    def _parse_markdown_content(self, pages: List[str]) -> Optional[ExtractedStudentResult]:
         """
         Parse markdown content to extract student result information
         
         Args:
-            content: Markdown content from Docling
+            pages: Text of each page (a single markdown page from Docling)
             
         Returns:
             ExtractedStudentResult or None
         """
         try:
             # DEBUG: Log first 500 chars of content to see what we're working with
-            logger.debug(f"Content preview (first 500 chars): {content[:500]}")
+            logger.debug(f"Content preview (first 500 chars): {pages[0][:500] if pages else ''}")
             
             # Extract USN (University Seat Number)
             # Pattern: matches "University Seat Number : 1SJ18CS000" or just "1SJ18CS000" if labeled
-            usn_match = re.search(r'(?:University Seat Number|USN)\s*[:\.]?\s*([A-Z0-9]{10})', content, re.IGNORECASE)
+            usn_match = _search_pages(_USN_LABEL_RE, pages)
             if not usn_match:
                 # Fallback: look for 10-char alphanumeric string starting with 1, 2, 3, or 4 followed by 2 letters
-                usn_match = re.search(r'\b([1-4][A-Z]{2}\d{2}[A-Z]{2}\d{3})\b', content)
+                usn_match = _search_pages(_USN_BARE_RE, pages)
 
             if not usn_match:
-                logger.error(f"USN not found in document. Content length: {len(content)}")
+                logger.error(f"USN not found in document. Content length: {sum(map(len, pages))}")
                 # logger.debug(f"Content dump: {content[:1000]}") # Too verbose?
                 return None
             usn = usn_match.group(1).strip().upper()
 
             # Extract Student Name
             # Pattern: "Student Name : MOHIT KUMAR"
-            name_match = re.search(r'(?:Student Name|Name)\s*[:\.]?\s*([A-Za-z\s\.]+)(?:\n|Semester)', content, re.IGNORECASE)
+            name_match = _search_pages(_NAME_RE, pages)
             if not name_match:
                 # Fallback: look for name in first few lines if not labeled
                 pass 
@@ -126,7 +355,7 @@ class VTUResultExtractor:
 
             # Extract Semester
             # Pattern: "Semester : 4"
-            semester_match = re.search(r'Semester\s*[:\.]?\s*(\d+)', content, re.IGNORECASE)
+            semester_match = _search_pages(_SEMESTER_RE, pages)
             if not semester_match:
                 # Try finding just a single digit 1-8 isolated if no label? Risky.
                 # Let's try "IV Semester" or "Fourth Semester" mapping if needed, but digits are standard vturesults.
@@ -138,10 +367,10 @@ class VTUResultExtractor:
             exam_month = None
             exam_year = None
             # Pattern: "December-2024" or "Jan/Feb 2024"
-            exam_period_match = re.search(r'([A-Za-z]+)(?:-|/)?([A-Za-z]+)?\s*[-–]\s*(\d{4})', content, re.IGNORECASE) 
+            exam_period_match = _search_pages(_EXAM_PERIOD_RE, pages)
             if not exam_period_match:
                  # Try simple Month-Year
-                 exam_period_match = re.search(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s*[-–]\s*(\d{4})', content, re.IGNORECASE)
+                 exam_period_match = _search_pages(_EXAM_MONTH_YEAR_RE, pages)
 
             if exam_period_match:
                 if len(exam_period_match.groups()) == 3 and exam_period_match.group(2):
@@ -164,177 +393,89 @@ class VTUResultExtractor:
                                 pass
 
             # Extract subjects and results
-            subjects = self._extract_subjects(content)
+            subjects = self._extract_subjects(pages)
             
             if not subjects:
                 logger.error("No subjects found in document")
                 return None
 
-            return ExtractedStudentResult(
-                usn=usn,
-                student_name=student_name,
-                semester=semester,
-                exam_month=exam_month,
-                exam_year=exam_year,
-                subjects=subjects
-            )
+            # One pydantic-core call validates the student and every subject row
+            return EXTRACTED_STUDENT_TA.validate_python({
+                "usn": usn,
+                "student_name": student_name,
+                "semester": semester,
+                "exam_month": exam_month,
+                "exam_year": exam_year,
+                "subjects": subjects,
+            })
 
         except Exception as e:
             logger.error(f"Error parsing markdown content: {str(e)}")
             return None
 
-    def _extract_subjects(self, content: str) -> List[ExtractedSubjectResult]:
+    def _extract_subjects(self, pages: List[str]) -> List[dict]:
         """
         Extract subject-wise results from VTU PDF content
         Handles multi-line subject names and various formatting issues
         
         Args:
-            content: Document content
+            pages: Text of each page (a subject may continue onto the next page)
             
         Returns:
-            List of ExtractedSubjectResult objects
+            List of ExtractedSubjectResult field dicts (validated with the student)
         """
-        subjects: List[ExtractedSubjectResult] = []
-
-        # VTU status codes can be more than just P/F
-        marks_re = re.compile(
-            r"(\d{1,3})\s+(\d{1,3})\s+(\d{1,3})\s+(P|F|A|W|X|NE)\s+(\d{4}-\d{2}-\d{2})"
-        )
-
-        # Subject code appears at the start of a line.
-        # IMPORTANT: Some PDFs glue code+name without a space (e.g., "BPHYS102PHYSICS...").
-        # In that case, we must NOT consume the first letter of the subject name as a code suffix.
-        # Only treat a trailing letter as part of the subject code if it's followed by whitespace/end.
-        subject_start_re = re.compile(r"^([A-Z]{3,6}\d{3}(?:[A-Z](?=\s|$))?)\s*(.*)$")
-
-        def clean_subject_name(name: str) -> str:
-            n = re.sub(r"\s+", " ", (name or "").strip())
-            # Heuristic: some PDFs leak a stray leading letter into the subject name
-            # e.g. "DINTRODUCTION TO ..." -> "INTRODUCTION TO ..."
-            if len(n) >= 12 and re.match(r"^[A-Z](INTRODUCTION|PRINCIPLES|FUNDAMENTALS)", n, re.IGNORECASE):
-                n = n[1:].lstrip()
-            return n
-
-        def is_noise_line(text: str) -> bool:
-            lowered = text.strip().lower()
-            if not lowered:
-                return True
-            if "nomenclature" in lowered or "abbreviations" in lowered or lowered.startswith("note"):
-                return True
-            if lowered.startswith("results of") or "registrar" in lowered or "sd/" in lowered:
-                return True
-            # Table header fragments that sometimes repeat in extracted text
-            header_tokens = [
-                "subject",
-                "code",
-                "subject name",
-                "internal",
-                "external",
-                "marks",
-                "total",
-                "result",
-                "announced",
-                "updated",
-                "on",
-            ]
-            # If the line is basically only header words, ignore it
-            words = re.findall(r"[a-zA-Z]+", lowered)
-            return bool(words) and all(w in header_tokens for w in words)
-
-        lines = content.split("\n")
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            start_match = subject_start_re.match(line)
-            if not start_match:
-                i += 1
+        subjects: List[dict] = []
+
+        marks_re = _MARKS_RE
+        subject_line_re = _SUBJECT_LINE_RE
+        clean_subject_name = _clean_subject_name
+        is_noise_line = _is_noise_line
+
+        # Single pass: every line is matched against the subject-line pattern once
+        # (which also covers same-line marks), and against the marks pattern only
+        # while a subject is waiting for its row
+        subject_code: Optional[str] = None
+        collected_name_parts: List[str] = []
+        for raw_line in chain.from_iterable(page.split("\n") for page in pages):
+            line = raw_line.strip()
+            if not line:
                 continue
 
-            subject_code = start_match.group(1)
-            rest_of_line = (start_match.group(2) or "").strip()
-            collected_name_parts: List[str] = []
-
-            # 1) Handle the common case where marks are on the SAME line as subject code.
-            if rest_of_line:
-                same_line_marks = marks_re.search(rest_of_line)
-                if same_line_marks:
-                    subject_name = clean_subject_name(rest_of_line[: same_line_marks.start()].strip())
-                    internal_marks = int(same_line_marks.group(1))
-                    external_marks = int(same_line_marks.group(2))
-                    total_marks = int(same_line_marks.group(3))
-                    result_status = same_line_marks.group(4)
-                    announced_date = same_line_marks.group(5)
-
-                    subjects.append(
-                        ExtractedSubjectResult(
-                            subject_code=subject_code,
-                            subject_name=subject_name,
-                            internal_marks=internal_marks if internal_marks != 0 else None,
-                            external_marks=external_marks if external_marks != 0 else None,
-                            total_marks=total_marks,
-                            result_status=result_status,
-                            announced_date=announced_date,
-                        )
-                    )
-                    i += 1
-                    continue
-
-                if not is_noise_line(rest_of_line):
-                    collected_name_parts.append(rest_of_line)
-
-            # 2) Otherwise, scan forward until we find the marks row.
-            i += 1
-            found_marks = False
-            while i < len(lines):
-                next_line = lines[i].strip()
-
-                if not next_line:
-                    i += 1
-                    continue
-
-                # Stop if we hit the next subject
-                if subject_start_re.match(next_line):
-                    break
-
-                next_marks = marks_re.search(next_line)
-                if next_marks:
-                    before_marks = next_line[: next_marks.start()].strip()
-                    if before_marks and not is_noise_line(before_marks):
-                        collected_name_parts.append(before_marks)
-
-                    internal_marks = int(next_marks.group(1))
-                    external_marks = int(next_marks.group(2))
-                    total_marks = int(next_marks.group(3))
-                    result_status = next_marks.group(4)
-                    announced_date = next_marks.group(5)
-
-                    subject_name = " ".join(p for p in collected_name_parts if p).strip()
-                    subject_name = clean_subject_name(subject_name)
-                    subjects.append(
-                        ExtractedSubjectResult(
-                            subject_code=subject_code,
-                            subject_name=subject_name,
-                            internal_marks=internal_marks if internal_marks != 0 else None,
-                            external_marks=external_marks if external_marks != 0 else None,
-                            total_marks=total_marks,
-                            result_status=result_status,
-                            announced_date=announced_date,
-                        )
-                    )
-                    found_marks = True
-                    i += 1
-                    break
-
-                # Continuation of subject name or noise: keep the name, but never abort the subject.
-                if not is_noise_line(next_line):
-                    collected_name_parts.append(next_line)
-                i += 1
+            start_match = subject_line_re.match(line)
+            if start_match:
+                # A new subject code; an earlier subject that never got its marks row is
+                # dropped (don't hard-fail the entire PDF)
+                # (code, name, internal, external, total, status, date, rest) in one call
+                groups = start_match.groups()
+                subject_code = groups[0]
+                collected_name_parts = []
+                if groups[2] is not None:
+                    # Common case: marks are on the SAME line as the subject code
+                    subjects.append(_subject_row(subject_code, clean_subject_name(groups[1]), groups[2:7]))
+                    subject_code = None
+                else:
+                    # Never has surrounding whitespace: \s* took the leading run, the line is stripped
+                    rest_of_line = groups[7]
+                    if rest_of_line and not is_noise_line(rest_of_line):
+                        collected_name_parts.append(rest_of_line)
+                continue
 
-            # If we never found marks for this subject, just move on (don’t hard-fail the entire PDF).
-            if not found_marks:
-                # Don't increment i here; outer loop continues from current i (likely at next subject).
+            if subject_code is None:
                 continue
 
+            # Otherwise scan forward until we find the marks row
+            next_marks = marks_re.search(line)
+            if next_marks:
+                before_marks = line[: next_marks.start()].rstrip()
+                if before_marks and not is_noise_line(before_marks):
+                    collected_name_parts.append(before_marks)
+                subject_name = clean_subject_name(" ".join(collected_name_parts))
+                subjects.append(_subject_row(subject_code, subject_name, next_marks.groups()))
+                subject_code = None
+            elif not is_noise_line(line):
+                # Continuation of subject name or noise: keep the name, but never abort the subject.
+                collected_name_parts.append(line)
+
         logger.info(f"Extracted {len(subjects)} subjects")
         return subjects
 
@@ -350,15 +491,13 @@ class VTUResultExtractor:
             True if successful, False otherwise
         """
         try:
-            # Convert to dict
-            data_dict = extracted_data.model_dump()
-            
             # Ensure output directory exists
-            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            path = Path(output_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
             
-            # Write to JSON file
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(data_dict, f, indent=2, ensure_ascii=False)
+            # Write to JSON file: pydantic-core serializes the model straight to UTF-8
+            # bytes (no intermediate dict), written in one go
+            path.write_bytes(EXTRACTED_STUDENT_TA.dump_json(extracted_data, indent=2))
             
             logger.info(f"Saved extracted data to {output_path}")
             return True
@@ -367,13 +506,14 @@ class VTUResultExtractor:
             logger.error(f"Error saving to JSON: {str(e)}")
             return False
 
-    def batch_extract(self, pdf_files: List[str], output_dir: str) -> Dict[str, any]:
+    def batch_extract(self, pdf_files: List[str], output_dir: str, n_workers: Optional[int] = None) -> Dict[str, any]:
         """
         Process multiple PDF files in batch
         
         Args:
             pdf_files: List of PDF file paths
             output_dir: Directory to save JSON outputs
+            n_workers: Extraction processes (default: CPU count); 1 extracts in this process
             
         Returns:
             Dictionary with processing statistics
@@ -386,10 +526,22 @@ class VTUResultExtractor:
             'errors': []
         }
         
-        for pdf_file in pdf_files:
+        # Files are independent, so extraction fans out to worker processes; JSON is
+        # still written here, in input order
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        pool = None
+        pending = []
+        if n_workers > 1 and len(pdf_files) > _SERIAL_BATCH_MAX:
+            pool = ProcessPoolExecutor(
+                max_workers=min(n_workers, len(pdf_files)), mp_context=multiprocessing.get_context("spawn")
+            )
+            pending = [pool.submit(extract_pdf, pdf_file) for pdf_file in pdf_files]
+
+        for idx, pdf_file in enumerate(pdf_files):
             try:
                 # Extract data
-                extracted_data = self.extract_from_pdf(pdf_file)
+                extracted_data = pending[idx].result() if pool else self.extract_from_pdf(pdf_file)
                 
                 if extracted_data:
                     # Generate output filename
@@ -410,6 +562,9 @@ class VTUResultExtractor:
             except Exception as e:
                 results['failed'] += 1
                 results['errors'].append(f"Error processing {pdf_file}: {str(e)}")
+
+        if pool:
+            pool.shutdown()
         
         logger.info(f"Batch processing completed: {results['successful']}/{results['total']} successful")
         return results
@@ -426,8 +581,45 @@ def extract_pdf(pdf_path: str) -> Optional[ExtractedStudentResult]:
     return extractor.extract_from_pdf(pdf_path)
 
 
-def extract_batch(pdf_files: List[str], output_dir: str) -> Dict:
+def extract_pdf_from_bytes(data: bytes, name: str = "upload.pdf") -> Optional[ExtractedStudentResult]:
+    """
+    Helper function to extract data from an in-memory PDF
+    """
+    return extractor.extract_from_bytes(data, name)
+
+
+def extract_batch(pdf_files: List[str], output_dir: str, n_workers: Optional[int] = None) -> Dict:
     """
     Helper function to extract data from multiple PDFs
     """
-    return extractor.batch_extract(pdf_files, output_dir)
+    return extractor.batch_extract(pdf_files, output_dir, n_workers)
+
+
+def process_single_pdf(file_path: str, filename: str, index: int, delete_after: bool = True):
+    """
+    Extract one uploaded PDF in a worker process.
+
+    Module-level (picklable) so batch uploads can run it in a process pool.
+    Returns a (status, filename, data_or_error, index) tuple of plain data.
+    """
+    try:
+        extracted_data = extract_pdf(file_path)
+
+        if extracted_data:
+            return ("success", filename, extracted_data, index)
+        else:
+            return ("failed", filename, "Failed to extract data", index)
+
+    except Exception as e:
+        return ("error", filename, str(e), index)
+
+    finally:
+        # Avoid filling data/raw with processed PDFs
+        if delete_after:
+            try:
+                p = Path(file_path)
+                if p.exists():
+                    p.unlink()
+            except Exception:
+                # Deletion failure should never kill processing
+                pass
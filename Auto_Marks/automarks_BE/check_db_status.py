@@ -1,10 +1,10 @@
 
-from app.database import SessionLocal
+from app.database import get_sessionmaker
 from app.models import UploadLog, UploadStatus
 from sqlalchemy import desc
 
 def check_upload_status():
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         logs = db.query(UploadLog).order_by(desc(UploadLog.upload_timestamp)).limit(5).all()
         for log in logs:
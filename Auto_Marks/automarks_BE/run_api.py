@@ -10,10 +10,37 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+
+def prefetch_docling_models() -> None:
+    """Download Docling's models before serving so the first upload doesn't wait on them."""
+    if os.getenv("USE_DOCLING", "false").lower() not in {"1", "true", "yes"} or os.getenv("DOCLING_ARTIFACTS"):
+        return
+    try:
+        from docling.pipeline.standard_pdf_pipeline import StandardPdfPipeline
+
+        # Exported so the API and its extraction workers load from this directory
+        os.environ["DOCLING_ARTIFACTS"] = str(StandardPdfPipeline.download_models_hf())
+    except Exception as e:  # noqa: BLE001
+        print(f"Docling model prefetch skipped: {e}")
+
+
 if __name__ == "__main__":
+    prefetch_docling_models()
+    # Auto-reload (a file watcher plus a single worker) is for development only
+    reload = os.getenv("API_RELOAD", str(os.getenv("APP_ENV", "development") == "development")) == "True"
+    # One process by default: upload progress and notification WebSockets live in the
+    # process that handles the upload, so with several workers a client connected to
+    # another one never sees them. uvicorn can't combine reload with workers either.
+    workers = 1 if reload else max(int(os.getenv("API_WORKERS", "1") or 1), 1)
+    # Inherited by the workers: DB pool sizing and PDF_WORKERS split their budgets by it
+    os.environ["WEB_CONCURRENCY"] = str(workers)
     uvicorn.run(
         "app.main:app",
         host=os.getenv("API_HOST", "0.0.0.0"),
         port=int(os.getenv("API_PORT", 8000)),
-        reload=os.getenv("API_RELOAD", "True") == "True"
+        reload=reload,
+        workers=None if workers == 1 else workers,
+        # "auto" picks uvloop/httptools (shipped with uvicorn[standard]) when available
+        loop=os.getenv("UVICORN_LOOP", "auto"),
+        http=os.getenv("UVICORN_HTTP", "auto"),
     )
\ No newline at end of file
@@ -0,0 +1,125 @@
+"""
+Migration script to narrow the results table column types (PostgreSQL)
+
+- result_status VARCHAR(4) -> native ENUM result_status_enum (P/F/A/W/X/NE)
+- internal_marks / external_marks / total_marks INT -> SMALLINT
+- results.upload_batch_id / upload_logs.batch_id VARCHAR(50) -> UUID
+  (the old "SINGLE" marker becomes the nil UUID)
+
+Views and the is_pass generated column read these columns and block
+ALTER COLUMN TYPE, so they are dropped and recreated around the change.
+Each step is skipped once applied. The table is rewritten; run it off-peak.
+"""
+from sqlalchemy import text
+from app.database import get_engine
+from app.models import (
+    ANALYTICS_VIEW_DDL,
+    IS_PASS_SQL,
+    NORMALIZE_RESULT_STATUS_SQL,
+    RESULT_STATUS_CODES,
+    SINGLE_UPLOAD_BATCH_ID,
+)
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PLAIN_VIEWS = ("vw_student_results", "vw_semester_summary", "vw_subject_statistics")
+MATERIALIZED_VIEWS = ("mv_subject_statistics", "mv_semester_summary")
+
+
+def _column_type(conn, table: str, column: str) -> str:
+    return conn.scalar(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = :table AND column_name = :column"
+        ),
+        {"table": table, "column": column},
+    )
+
+
+def _convert_status_and_marks(conn):
+    # Legacy long-form values (PASS/FAIL/...) would not cast to the enum
+    conn.execute(text(NORMALIZE_RESULT_STATUS_SQL))
+    logger.info("✓ Normalized legacy result status values")
+
+    labels = ", ".join(f"'{code}'" for code in RESULT_STATUS_CODES)
+    conn.execute(text(f"""
+        DO $$ BEGIN
+            CREATE TYPE result_status_enum AS ENUM ({labels});
+        EXCEPTION WHEN duplicate_object THEN NULL;
+        END $$
+    """))
+    logger.info("✓ result_status_enum type ready")
+
+    conn.execute(text("ALTER TABLE results DROP COLUMN IF EXISTS is_pass"))
+    conn.execute(text("""
+        ALTER TABLE results
+            ALTER COLUMN internal_marks TYPE SMALLINT,
+            ALTER COLUMN external_marks TYPE SMALLINT,
+            ALTER COLUMN total_marks TYPE SMALLINT,
+            ALTER COLUMN result_status TYPE result_status_enum
+                USING result_status::result_status_enum
+    """))
+    conn.execute(text(
+        f"ALTER TABLE results ADD COLUMN is_pass BOOLEAN GENERATED ALWAYS AS ({IS_PASS_SQL}) STORED"
+    ))
+    logger.info("✓ Converted result status and marks columns")
+
+
+def _convert_batch_ids(conn):
+    conn.execute(
+        text("UPDATE results SET upload_batch_id = :single WHERE upload_batch_id = 'SINGLE'"),
+        {"single": SINGLE_UPLOAD_BATCH_ID},
+    )
+    conn.execute(text(
+        "ALTER TABLE results ALTER COLUMN upload_batch_id TYPE UUID USING upload_batch_id::uuid"
+    ))
+    conn.execute(text(
+        "ALTER TABLE upload_logs ALTER COLUMN batch_id TYPE UUID USING batch_id::uuid"
+    ))
+    logger.info("✓ Converted upload batch ids to UUID")
+
+
+def migrate():
+    """Convert results columns to their narrow PostgreSQL types"""
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        logger.info("Not PostgreSQL; nothing to convert")
+        return
+
+    with engine.begin() as conn:
+        status_done = _column_type(conn, "results", "result_status") == "USER-DEFINED"
+        batch_ids_done = _column_type(conn, "results", "upload_batch_id") == "uuid"
+        if status_done and batch_ids_done:
+            logger.info("results already migrated")
+            return
+
+        views = conn.execute(
+            text("SELECT viewname, definition FROM pg_views WHERE viewname = ANY(:names)"),
+            {"names": list(PLAIN_VIEWS)},
+        ).all()
+        for name in MATERIALIZED_VIEWS:
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {name}"))
+        for name, _ in views:
+            conn.execute(text(f"DROP VIEW IF EXISTS {name}"))
+
+        if not status_done:
+            _convert_status_and_marks(conn)
+        if not batch_ids_done:
+            _convert_batch_ids(conn)
+
+        for name, definition in views:
+            conn.execute(text(f"CREATE VIEW {name} AS {definition}"))
+        for ddl in ANALYTICS_VIEW_DDL:
+            conn.execute(text(ddl))
+        logger.info("✓ Recreated dependent views")
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE results"))
+
+    logger.info("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    migrate()
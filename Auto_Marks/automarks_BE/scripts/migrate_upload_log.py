@@ -3,7 +3,7 @@ Migration script to add current_file and current_file_index columns to upload_lo
 Run this script to update the database schema (PostgreSQL compatible)
 """
 from sqlalchemy import text
-from app.database import engine
+from app.database import get_engine
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -11,7 +11,7 @@ logger = logging.getLogger(__name__)
 
 def migrate():
     """Add new columns to upload_logs table"""
-    with engine.begin() as conn:
+    with get_engine().begin() as conn:
         try:
             # Add current_file column (IF NOT EXISTS is PostgreSQL 9.6+)
             conn.execute(text("""
@@ -32,6 +32,17 @@ def migrate():
         except Exception as e:
             logger.error(f"Error adding current_file_index: {e}")
 
+        try:
+            # Latest-uploads listings (ORDER BY upload_timestamp DESC LIMIT n) read this
+            # backwards instead of sorting the whole log
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_upload_logs_upload_timestamp
+                ON upload_logs (upload_timestamp)
+            """))
+            logger.info("✓ Added upload_timestamp index")
+        except Exception as e:
+            logger.error(f"Error adding upload_timestamp index: {e}")
+
         logger.info("✅ Migration completed successfully!")
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+"""
+Migration script to LIST-partition the results table by semester_id (PostgreSQL 13+)
+
+Analytics filter results by semester, so with one partition per semester the
+planner prunes every other semester's heap and index pages.
+
+- Copies results into a partitioned table with one results_sem_<id> partition
+  per existing semester plus results_default (the API adds a partition for each
+  semester it creates from then on)
+- The primary key becomes (id, semester_id): unique constraints on a
+  partitioned table must include the partition key
+- Dependent views are dropped and recreated around the swap
+
+Runs in one transaction and rewrites the table; run it off-peak.
+"""
+from sqlalchemy import text
+from app.database import get_engine
+from app.models import ANALYTICS_VIEW_DDL, Result
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PLAIN_VIEWS = ("vw_student_results", "vw_semester_summary", "vw_subject_statistics")
+MATERIALIZED_VIEWS = ("mv_subject_statistics", "mv_semester_summary")
+
+
+def migrate():
+    """Swap results for a partitioned copy"""
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        logger.info("Not PostgreSQL; partitioning is not supported")
+        return
+
+    with engine.begin() as conn:
+        if conn.scalar(text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'results'::regclass")):
+            logger.info("results is already partitioned")
+            return
+
+        conn.execute(text("LOCK TABLE results IN ACCESS EXCLUSIVE MODE"))
+
+        views = conn.execute(
+            text("SELECT viewname, definition FROM pg_views WHERE viewname = ANY(:names)"),
+            {"names": list(PLAIN_VIEWS)},
+        ).all()
+        for name in MATERIALIZED_VIEWS:
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {name}"))
+        for name, _ in views:
+            conn.execute(text(f"DROP VIEW IF EXISTS {name}"))
+
+        conn.execute(text("""
+            CREATE TABLE results_partitioned (
+                LIKE results INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS
+            ) PARTITION BY LIST (semester_id)
+        """))
+        semester_ids = conn.scalars(text("SELECT id FROM semesters ORDER BY id")).all()
+        for semester_id in semester_ids:
+            conn.execute(text(
+                f"CREATE TABLE results_sem_{semester_id} "
+                f"PARTITION OF results_partitioned FOR VALUES IN ({semester_id})"
+            ))
+        conn.execute(text("CREATE TABLE results_default PARTITION OF results_partitioned DEFAULT"))
+        logger.info(f"✓ Created {len(semester_ids)} semester partitions")
+
+        columns = ", ".join(conn.scalars(text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_name = 'results' AND is_generated = 'NEVER' ORDER BY ordinal_position"
+        )).all())
+        conn.execute(text(f"INSERT INTO results_partitioned ({columns}) SELECT {columns} FROM results"))
+        logger.info("✓ Copied result rows")
+
+        # Keep the id sequence when the old table (its owner) is dropped
+        conn.execute(text("ALTER SEQUENCE results_id_seq OWNED BY NONE"))
+        conn.execute(text("DROP TABLE results"))
+        conn.execute(text("ALTER TABLE results_partitioned RENAME TO results"))
+        conn.execute(text("ALTER SEQUENCE results_id_seq OWNED BY results.id"))
+
+        conn.execute(text("ALTER TABLE results ADD CONSTRAINT results_pkey PRIMARY KEY (id, semester_id)"))
+        conn.execute(text(
+            "ALTER TABLE results ADD CONSTRAINT uq_result_student_sem_subject "
+            "UNIQUE (student_id, semester_id, subject_id)"
+        ))
+        for column, target in (("student_id", "students"), ("semester_id", "semesters"), ("subject_id", "subjects")):
+            conn.execute(text(
+                f"ALTER TABLE results ADD FOREIGN KEY ({column}) REFERENCES {target}(id) ON DELETE CASCADE"
+            ))
+        # Indexes on the parent cascade to every partition (local indexes)
+        for index in Result.__table__.indexes:
+            index.create(conn, checkfirst=True)
+        logger.info("✓ Recreated keys and indexes")
+
+        if conn.scalar(text("SELECT 1 FROM pg_proc WHERE proname = 'update_updated_at_column'")):
+            conn.execute(text(
+                "CREATE TRIGGER trg_results_updated_at BEFORE UPDATE ON results "
+                "FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()"
+            ))
+
+        for name, definition in views:
+            conn.execute(text(f"CREATE VIEW {name} AS {definition}"))
+        for ddl in ANALYTICS_VIEW_DDL:
+            conn.execute(text(ddl))
+        logger.info("✓ Recreated dependent views")
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE results"))
+
+    logger.info("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    migrate()
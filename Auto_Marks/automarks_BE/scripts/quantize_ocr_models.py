@@ -0,0 +1,60 @@
+"""Quantize RapidOCR's ONNX models to int8 for the PDF converter utility.
+
+Dynamic int8 quantization stores weights as 8-bit integers: the models take about a
+quarter of the memory and usually run faster on CPU (most on CPUs with VNNI, or I8MM on ARM).
+Accuracy on printed result sheets is normally unaffected, but spot-check a few conversions.
+
+Usage (PowerShell):
+  pip install rapidocr_onnxruntime onnx
+  python scripts/quantize_ocr_models.py models/ocr_int8
+  $env:AUTOMARKS_OCR_MODEL_DIR="models/ocr_int8"; python utils/pdf_converter.py -b data/raw
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import sys
+from pathlib import Path
+
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Output names read by utils/pdf_converter.py (see _ocr_options)
+MODEL_ROLES = ("det", "cls", "rec")
+
+
+def _rapidocr_models() -> dict[str, Path]:
+    """The detection, classification and recognition models shipped with rapidocr_onnxruntime"""
+    spec = importlib.util.find_spec("rapidocr_onnxruntime")
+    if spec is None or spec.origin is None:
+        raise SystemExit("rapidocr_onnxruntime is not installed (pip install rapidocr_onnxruntime)")
+    models_dir = Path(spec.origin).parent / "models"
+    models = {}
+    for model in sorted(models_dir.glob("*.onnx")):
+        for role in MODEL_ROLES:
+            if f"_{role}_" in model.name:
+                models.setdefault(role, model)
+    missing = [role for role in MODEL_ROLES if role not in models]
+    if missing:
+        raise SystemExit(f"No {', '.join(missing)} model found in {models_dir}")
+    return models
+
+
+def main() -> None:
+    output_dir = Path(sys.argv[1] if len(sys.argv) > 1 else "models/ocr_int8")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for role, model in _rapidocr_models().items():
+        target = output_dir / f"{role}_int8.onnx"
+        # QUInt8 weights are supported by every ONNX Runtime CPU kernel (QInt8 Conv is not)
+        quantize_dynamic(str(model), str(target), weight_type=QuantType.QUInt8)
+        logger.info(f"✓ {model.name} -> {target} ({model.stat().st_size // 1024} KB -> {target.stat().st_size // 1024} KB)")
+
+    print(f"\nSet AUTOMARKS_OCR_MODEL_DIR={output_dir} to use the int8 models")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,15 +23,18 @@ import os
 import re
 from typing import Dict, List, Tuple
 
-from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
-from app.database import SessionLocal
+from app.database import get_sessionmaker
 from app.models import Result, Subject
 
 
 SUFFIX_CODE_RE = re.compile(r"^([A-Z]{3,6}\d{3})([A-Z])$")
 BASE_CODE_RE = re.compile(r"^([A-Z]{3,6}\d{3})")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Result ids per bulk UPDATE/DELETE statement (keeps IN lists under driver parameter limits)
+ID_CHUNK = 1000
 
 # Known high-signal "missing first letter" prefixes observed in VTU exports.
 # We keep this intentionally small to avoid damaging legit codes like BESCK104D.
@@ -108,7 +111,7 @@ def repair_subject_codes(db: Session, dry_run: bool) -> Dict[str, int]:
 
         # Only apply if it matches one of our high-signal broken-name prefixes.
         # This avoids breaking legitimate suffix codes like BESCK104D, BETCK105I.
-        upper_name = re.sub(r"\s+", " ", name).upper()
+        upper_name = WHITESPACE_RE.sub(" ", name).upper()
         first_word = upper_name.split(" ", 1)[0]
         expected_prefix_letter = MISSING_FIRST_LETTER_PREFIXES.get(first_word)
         if expected_prefix_letter != suffix:
@@ -144,37 +147,43 @@ def repair_subject_codes(db: Session, dry_run: bool) -> Dict[str, int]:
             bad_subject = subject_to_fix
 
             bad_results: List[Result] = db.query(Result).filter(Result.subject_id == bad_subject.id).all()
-
+            # One query for the target's rows; each collision check is then a dict lookup.
+            # (student_id, semester_id) is unique within bad_results, so moves below never
+            # need to be reflected in this map.
+            existing_by_key: Dict[Tuple[int, int], Result] = {
+                (r.student_id, r.semester_id): r
+                for r in db.query(Result).filter(Result.subject_id == good_subject.id)
+            }
+
+            move_ids: List[int] = []
+            delete_ids: List[int] = []
             for r in bad_results:
-                existing: Result | None = (
-                    db.query(Result)
-                    .filter(
-                        and_(
-                            Result.student_id == r.student_id,
-                            Result.semester_id == r.semester_id,
-                            Result.subject_id == good_subject.id,
-                        )
-                    )
-                    .one_or_none()
-                )
+                existing: Result | None = existing_by_key.get((r.student_id, r.semester_id))
 
                 if existing is None:
-                    if not dry_run:
-                        r.subject_id = good_subject.id
+                    move_ids.append(r.id)
                     stats["results_moved"] += 1
                     continue
 
                 keep = _pick_better_result(existing, r)
                 if keep is r:
-                    if not dry_run:
-                        r.subject_id = good_subject.id
-                        db.delete(existing)
+                    move_ids.append(r.id)
+                    delete_ids.append(existing.id)
                 else:
-                    if not dry_run:
-                        db.delete(r)
+                    delete_ids.append(r.id)
 
                 stats["results_deduped"] += 1
 
+            if not dry_run:
+                # Set-based statements instead of one per row. Deletes go first so a moved
+                # row never collides with the one it replaces on the unique constraint.
+                for i in range(0, len(delete_ids), ID_CHUNK):
+                    db.query(Result).filter(Result.id.in_(delete_ids[i : i + ID_CHUNK])).delete()
+                for i in range(0, len(move_ids), ID_CHUNK):
+                    db.query(Result).filter(Result.id.in_(move_ids[i : i + ID_CHUNK])).update(
+                        {Result.subject_id: good_subject.id}
+                    )
+
             # Optionally improve the subject name if we have a better fixed name.
             if target_name and target_name.strip():
                 if not dry_run and good_subject.subject_name != target_name:
@@ -206,7 +215,7 @@ def repair_subject_codes(db: Session, dry_run: bool) -> Dict[str, int]:
 def main() -> None:
     dry_run = os.getenv("DRY_RUN", "false").lower() in {"1", "true", "yes"}
 
-    db = SessionLocal()
+    db = get_sessionmaker()()
     try:
         stats = repair_subject_codes(db, dry_run=dry_run)
         if dry_run:
@@ -13,6 +13,8 @@
 -- 8. Exit: \q
 
 -- Drop existing views first (depends on tables)
+DROP MATERIALIZED VIEW IF EXISTS mv_subject_statistics;
+DROP MATERIALIZED VIEW IF EXISTS mv_semester_summary;
 DROP VIEW IF EXISTS vw_subject_statistics;
 DROP VIEW IF EXISTS vw_semester_summary;
 DROP VIEW IF EXISTS vw_student_results;
@@ -24,6 +26,10 @@ DROP TABLE IF EXISTS students CASCADE;
 DROP TABLE IF EXISTS semesters CASCADE;
 DROP TABLE IF EXISTS upload_logs CASCADE;
 DROP TABLE IF EXISTS notifications CASCADE;
+DROP TYPE IF EXISTS result_status_enum;
+
+-- Stored result status codes (see RESULT_STATUS_CODES in app/models.py)
+CREATE TYPE result_status_enum AS ENUM ('P', 'F', 'A', 'W', 'X', 'NE');
 
 -- Create Students table
 CREATE TABLE students (
@@ -40,6 +46,7 @@ CREATE INDEX idx_students_usn ON students (usn);
 CREATE INDEX idx_students_student_name ON students (student_name);
 CREATE INDEX idx_students_batch ON students (batch);
 CREATE INDEX idx_students_branch ON students (branch);
+CREATE INDEX ix_students_batch_branch ON students (batch, branch);
 
 -- Create Semesters table
 CREATE TABLE semesters (
@@ -52,6 +59,7 @@ CREATE TABLE semesters (
 );
 
 CREATE INDEX idx_semesters_semester_number ON semesters (semester_number);
+CREATE INDEX ix_semesters_year_month_num ON semesters (exam_year, exam_month, semester_number);
 
 -- Create Subjects table
 CREATE TABLE subjects (
@@ -65,35 +73,48 @@ CREATE TABLE subjects (
 CREATE INDEX idx_subjects_subject_code ON subjects (subject_code);
 
 -- Create Results table
+-- LIST-partitioned by semester (PostgreSQL 13+): analytics prune to one semester's
+-- partition. The API creates results_sem_<id> whenever it adds a semester; rows for
+-- semesters without a partition land in results_default.
 CREATE TABLE results (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     student_id INT NOT NULL REFERENCES students(id) ON DELETE CASCADE,
     semester_id INT NOT NULL REFERENCES semesters(id) ON DELETE CASCADE,
     subject_id INT NOT NULL REFERENCES subjects(id) ON DELETE CASCADE,
-    internal_marks INT DEFAULT NULL,
-    external_marks INT DEFAULT NULL,
-    total_marks INT DEFAULT NULL,
-    upload_batch_id VARCHAR(50) DEFAULT NULL,
-    result_status VARCHAR(4) DEFAULT NULL,
+    internal_marks SMALLINT DEFAULT NULL,
+    external_marks SMALLINT DEFAULT NULL,
+    total_marks SMALLINT DEFAULT NULL,
+    upload_batch_id UUID DEFAULT NULL,
+    result_status result_status_enum DEFAULT NULL,
     announced_date DATE DEFAULT NULL,
+    is_pass BOOLEAN GENERATED ALWAYS AS (result_status = 'P') STORED,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW(),
-    UNIQUE (student_id, semester_id, subject_id),
+    PRIMARY KEY (id, semester_id),
+    CONSTRAINT uq_result_student_sem_subject UNIQUE (student_id, semester_id, subject_id),
     CONSTRAINT ck_internal_marks_range CHECK (internal_marks IS NULL OR (internal_marks >= 0 AND internal_marks <= 50)),
     CONSTRAINT ck_external_marks_range CHECK (external_marks IS NULL OR (external_marks >= 0 AND external_marks <= 100)),
     CONSTRAINT ck_total_marks_range CHECK (total_marks IS NULL OR (total_marks >= 0 AND total_marks <= 200))
-);
+) PARTITION BY LIST (semester_id);
 
-CREATE INDEX idx_results_student_id ON results (student_id);
-CREATE INDEX idx_results_semester_id ON results (semester_id);
+CREATE TABLE results_default PARTITION OF results DEFAULT;
+
+-- student_id and semester_id are served by the unique constraint and
+-- ix_results_stats_cover (both lead with them); subject_id has no such prefix
 CREATE INDEX idx_results_subject_id ON results (subject_id);
-CREATE INDEX idx_results_result_status ON results (result_status);
 CREATE INDEX idx_results_upload_batch_id ON results (upload_batch_id);
+CREATE INDEX ix_results_stats_cover ON results (semester_id, subject_id, result_status)
+    INCLUDE (internal_marks, external_marks, total_marks);
+CREATE INDEX ix_results_nonpass ON results (semester_id, subject_id) WHERE result_status <> 'P';
+-- Time-range audits: rows arrive in timestamp order, so BRIN stays tiny
+CREATE INDEX ix_results_created_brin ON results USING brin (created_at);
+CREATE INDEX ix_results_announced_brin ON results USING brin (announced_date);
+-- After bulk loads: ANALYZE results;
 
 -- Create Upload Logs table (to track batch uploads)
 CREATE TABLE upload_logs (
     id SERIAL PRIMARY KEY,
-    batch_id VARCHAR(50) UNIQUE NOT NULL,
+    batch_id UUID UNIQUE NOT NULL,
     total_files INT DEFAULT 0,
     processed_files INT DEFAULT 0,
     failed_files INT DEFAULT 0,
@@ -107,6 +128,7 @@ CREATE TABLE upload_logs (
 
 CREATE INDEX idx_upload_logs_batch_id ON upload_logs (batch_id);
 CREATE INDEX idx_upload_logs_status ON upload_logs (status);
+CREATE INDEX ix_upload_logs_upload_timestamp ON upload_logs (upload_timestamp);
 
 -- Create Notifications table
 CREATE TABLE notifications (
@@ -205,6 +227,53 @@ JOIN subjects sub ON r.subject_id = sub.id
 JOIN semesters sem ON r.semester_id = sem.id
 GROUP BY sem.semester_number, sub.id, sub.subject_code, sub.subject_name;
 
+-- ============================================
+-- Materialized analytics rollups
+-- ============================================
+-- Read by /analytics/subject-stats and /analytics/student-summary; the API
+-- creates them on startup if missing and refreshes them after each upload:
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY mv_subject_statistics;
+-- Marks are kept as SUM/COUNT pairs so filtered reads can re-aggregate averages.
+CREATE MATERIALIZED VIEW mv_subject_statistics AS
+SELECT
+    r.subject_id,
+    r.semester_id,
+    COALESCE(st.batch, '') as batch,
+    COALESCE(st.branch, '') as branch,
+    COUNT(*) as total_students,
+    SUM(r.internal_marks) as sum_internal,
+    COUNT(r.internal_marks) as n_internal,
+    SUM(r.external_marks) as sum_external,
+    COUNT(r.external_marks) as n_external,
+    SUM(r.total_marks) as sum_total,
+    COUNT(r.total_marks) as n_total,
+    MAX(r.total_marks) as max_marks,
+    MIN(r.total_marks) as min_marks,
+    COUNT(*) FILTER (WHERE r.is_pass) as pass_count,
+    COUNT(*) FILTER (WHERE r.result_status = 'F') as fail_count,
+    MIN(r.id) as first_result_id
+FROM results r
+JOIN students st ON st.id = r.student_id
+GROUP BY r.subject_id, r.semester_id, COALESCE(st.batch, ''), COALESCE(st.branch, '');
+
+CREATE UNIQUE INDEX ux_mv_subject_statistics ON mv_subject_statistics (subject_id, semester_id, batch, branch);
+
+CREATE MATERIALIZED VIEW mv_semester_summary AS
+SELECT
+    r.student_id,
+    r.semester_id,
+    COUNT(*) as total_subjects,
+    COUNT(*) FILTER (WHERE r.is_pass) as subjects_passed,
+    COUNT(*) FILTER (WHERE r.result_status = 'F') as subjects_failed,
+    SUM(r.total_marks) as sum_total,
+    COUNT(r.total_marks) as n_total,
+    MAX(r.total_marks) as highest_marks,
+    MIN(r.total_marks) as lowest_marks
+FROM results r
+GROUP BY r.student_id, r.semester_id;
+
+CREATE UNIQUE INDEX ux_mv_semester_summary ON mv_semester_summary (student_id, semester_id);
+
 -- Sample queries for reference
 
 -- Query 1: Get all results for a specific student
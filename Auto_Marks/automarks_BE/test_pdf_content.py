@@ -2,9 +2,56 @@
 Debug script to see what's actually in the PDF files
 """
 from pypdf import PdfReader
+import io
+import multiprocessing
 import sys
 import os
 
+# Short PDFs (VTU results are a page or two) aren't worth starting worker processes for
+PARALLEL_MIN_PAGES = 8
+# Larger files are parsed from disk rather than held in memory as well
+IN_MEMORY_MAX_BYTES = 100 * 1024 * 1024
+# Characters printed per page
+PREVIEW_CHARS = 2000
+
+_worker_reader = None
+
+
+def _open_reader(source):
+    """PdfReader over a path, or over PDF bytes already read into memory"""
+    return PdfReader(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _init_worker(source):
+    """Parse the PDF once per worker process"""
+    global _worker_reader
+    _worker_reader = _open_reader(source)
+
+
+def _page_preview(page):
+    """(first PREVIEW_CHARS characters, total length); the rest of the text is dropped right away"""
+    text = page.extract_text() or ""
+    return text[:PREVIEW_CHARS], len(text)
+
+
+def _extract_page(index):
+    # Only the preview is pickled back to the parent, not the whole page text
+    return _page_preview(_worker_reader.pages[index])
+
+
+def _page_previews(reader, source):
+    """Page previews in order; long PDFs are extracted on a worker pool"""
+    page_count = len(reader.pages)
+    workers = min(os.cpu_count() or 1, page_count)
+    if page_count < PARALLEL_MIN_PAGES or workers <= 1:
+        for page in reader.pages:
+            yield _page_preview(page)
+        return
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(source,)) as pool:
+        yield from pool.imap(_extract_page, range(page_count), chunksize=4)
+
+
 def debug_pdf(pdf_path):
     """Print raw text from PDF to see what we're working with"""
     print(f"\n{'='*80}")
@@ -16,14 +63,20 @@ def debug_pdf(pdf_path):
         return
     
     try:
-        reader = PdfReader(pdf_path)
+        # One sequential read; pypdf then seeks within memory instead of the file
+        source = pdf_path
+        if os.path.getsize(pdf_path) <= IN_MEMORY_MAX_BYTES:
+            # Unbuffered: a whole-file read gains nothing from BufferedReader's extra copy
+            with open(pdf_path, "rb", buffering=0) as f:
+                source = f.read()
+        reader = _open_reader(source)
         print(f"Number of pages: {len(reader.pages)}\n")
         
-        for i, page in enumerate(reader.pages, 1):
-            print(f"\n--- PAGE {i} ---")
-            text = page.extract_text() or ""
-            print(text[:2000])  # Print first 2000 chars
-            print(f"\n... (Total {len(text)} characters)")
+        # One write per page instead of three print() calls
+        write = sys.stdout.write
+        for i, (preview, length) in enumerate(_page_previews(reader, source), 1):
+            write(f"\n--- PAGE {i} ---\n{preview}\n\n... (Total {length} characters)\n")
+        sys.stdout.flush()
             
     except Exception as e:
         print(f"ERROR: {e}")
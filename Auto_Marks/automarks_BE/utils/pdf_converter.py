@@ -3,63 +3,261 @@ PDF to JSON Converter Utility
 Standalone utility for converting VTU Result PDFs to JSON
 Can be used independently or integrated with the main application
 """
-from docling.document_converter import DocumentConverter
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions
-import json
+# docling (torch, onnxruntime, ...) is imported only where a converter is built or used,
+# so the CLI help and batch orchestration start without loading it
+from pypdf import PdfReader
+import asyncio
+import hashlib
+import importlib.util
+import io
+import orjson
+import multiprocessing
+from functools import lru_cache
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional, Dict
+from typing import TYPE_CHECKING, BinaryIO, Dict, Optional, Union
 import logging
 
+try:  # Optional dependency path (faster cache keys)
+    import xxhash
+
+    _xxhash_available = True
+except Exception:  # noqa: BLE001
+    _xxhash_available = False
+
+if TYPE_CHECKING:
+    from docling.document_converter import DocumentConverter
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# OCR engine: "rapidocr" (ONNX Runtime), "tesseract" (tesseract CLI) or "easyocr" (PyTorch,
+# docling's default); "auto" takes RapidOCR when rapidocr_onnxruntime is installed
+OCR_BACKEND = os.getenv("AUTOMARKS_OCR_BACKEND", "auto").lower()
+# Directory of int8 RapidOCR models from scripts/quantize_ocr_models.py (implies rapidocr)
+OCR_MODEL_DIR = os.getenv("AUTOMARKS_OCR_MODEL_DIR")
+# Pages docling pushes through each model stage (layout, OCR, tables) per forward pass;
+# larger batches keep a GPU busy at the cost of memory (docling's own default is 4)
+PAGE_BATCH_SIZE = int(os.getenv("AUTOMARKS_PAGE_BATCH_SIZE", "16"))
+
+
+def _ocr_options():
+    from docling.datamodel.pipeline_options import EasyOcrOptions, RapidOcrOptions, TesseractCliOcrOptions
+
+    backend = OCR_BACKEND
+    if backend == "auto":
+        backend = "rapidocr" if OCR_MODEL_DIR or importlib.util.find_spec("rapidocr_onnxruntime") else "easyocr"
+    if backend == "rapidocr":
+        if OCR_MODEL_DIR:
+            model_dir = Path(OCR_MODEL_DIR)
+            return RapidOcrOptions(
+                det_model_path=str(model_dir / "det_int8.onnx"),
+                cls_model_path=str(model_dir / "cls_int8.onnx"),
+                rec_model_path=str(model_dir / "rec_int8.onnx"),
+            )
+        return RapidOcrOptions()
+    if backend == "tesseract":
+        return TesseractCliOcrOptions()
+    return EasyOcrOptions()
+
+
+# JSON layouts convert_to_json can write (see PDFConverter.export_vtu_schema)
+SCHEMAS = ("vtu", "full")
+
+# Born-digital PDFs average at least this many extractable characters per sampled page
+TEXT_LAYER_MIN_CHARS = 200
+TEXT_LAYER_SAMPLE_PAGES = 3
+
+
+def _has_text_layer(pdf_source: Union[Path, io.BytesIO]) -> bool:
+    """True when the first pages already carry a text layer, so OCR would only redo it"""
+    try:
+        reader = PdfReader(pdf_source)
+        sample = [reader.pages[i] for i in range(min(TEXT_LAYER_SAMPLE_PAGES, len(reader.pages)))]
+        if not sample:
+            return False
+        chars = sum(len((page.extract_text() or "").strip()) for page in sample)
+    except Exception:  # noqa: BLE001
+        # Unreadable for pypdf: let docling (with OCR) handle it
+        return False
+    finally:
+        if isinstance(pdf_source, io.BytesIO):
+            pdf_source.seek(0)
+    return chars / len(sample) > TEXT_LAYER_MIN_CHARS
+
+
+def _write_json(output_path: Path, doc_dict: Dict) -> None:
+    """Write a converted document; orjson emits UTF-8 bytes directly (non-ASCII kept)"""
+    output_path.write_bytes(
+        orjson.dumps(doc_dict, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    )
+
+
+def _file_digest(pdf_file: Path) -> str:
+    """Content key for the conversion cache; not cryptographic, so xxh3 when available"""
+    # The algorithm prefix keeps keys from either hasher apart in a shared cache directory
+    if _xxhash_available:
+        hasher, prefix = xxhash.xxh3_128(), "xxh3"
+    else:
+        # stdlib fallback; releases the GIL while hashing
+        hasher, prefix = hashlib.blake2b(digest_size=16), "b2"
+    with pdf_file.open("rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):  # not on Windows
+            # One front-to-back pass: let the kernel read ahead aggressively
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        for chunk in iter(lambda: f.read(4 << 20), b""):
+            hasher.update(chunk)
+    return f"{prefix}-{hasher.hexdigest()}"
+
+
+def _write_cached_json(output_path: Path, cache_path: Path, doc_dict: Dict) -> None:
+    """Write a converted document and keep a copy under its content hash"""
+    _write_json(output_path, doc_dict)
+    shutil.copyfile(output_path, cache_path)
+
+
+@lru_cache(maxsize=4)
+def _build_converter(do_ocr: bool, do_table_structure: bool) -> "DocumentConverter":
+    """One DocumentConverter per pipeline configuration and process; its models load once and stay warm"""
+    from docling.datamodel.base_models import InputFormat
+    from docling.datamodel.pipeline_options import (
+        AcceleratorDevice,
+        AcceleratorOptions,
+        PdfPipelineOptions,
+        TableFormerMode,
+    )
+    from docling.datamodel.settings import settings
+    from docling.document_converter import DocumentConverter, PdfFormatOption
+
+    # Process-wide docling setting; every converter built here uses the same value
+    settings.perf.page_batch_size = PAGE_BATCH_SIZE
+
+    # Configure PDF pipeline options
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.do_ocr = do_ocr
+    pipeline_options.do_table_structure = do_table_structure
+    pipeline_options.ocr_options = _ocr_options()
+    # The fast TableFormer variant is plenty for the single marks table
+    pipeline_options.table_structure_options.mode = TableFormerMode.FAST
+    # CUDA/MPS when present, otherwise all cores
+    pipeline_options.accelerator_options = AcceleratorOptions(
+        num_threads=os.cpu_count() or 4, device=AcceleratorDevice.AUTO
+    )
+
+    return DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+        }
+    )
+
 
 class PDFConverter:
     """PDF to JSON converter with OCR support"""
     
     def __init__(self):
-        """Initialize the document converter with optimized settings"""
-        # Configure PDF pipeline options
-        pipeline_options = PdfPipelineOptions()
-        pipeline_options.do_ocr = True
-        pipeline_options.do_table_structure = True
-        
-        self.converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: pipeline_options
-            }
-        )
+        """Initialize the document converter with optimized settings (shared by all instances)"""
+        self.converter = _build_converter(True, True)
+        # Same pipeline without OCR, for PDFs that already have a text layer
+        self._text_converter = _build_converter(False, True)
+
+    @classmethod
+    def warmup(cls, pdf_path: Optional[str] = None) -> None:
+        """
+        Load the pipeline models now instead of on the first conversion
+        
+        Args:
+            pdf_path: Optional PDF for one throwaway conversion (also warms OCR/table sessions)
+        """
+        converter = cls().converter
+        if pdf_path is not None:
+            converter.convert(pdf_path)
+        else:
+            from docling.datamodel.base_models import InputFormat
+
+            converter.initialize_pipeline(InputFormat.PDF)
+
+    @staticmethod
+    def export_vtu_schema(result) -> Dict:
+        """
+        Flat export with just what VTU result parsing reads: page texts and table cell grids
+        
+        Skips the provenance boxes, fonts and layout clusters that make up most of a full
+        docling export.
+        """
+        document = result.document
+
+        def page_of(item) -> Optional[int]:
+            return item.prov[0].page_no if item.prov else None
+
+        return {
+            "name": document.name,
+            "texts": [{"page": page_of(item), "text": item.text} for item in document.texts],
+            "tables": [
+                {"page": page_of(table), "rows": [[cell.text for cell in row] for row in table.data.grid]}
+                for table in document.tables
+            ],
+        }
     
     def convert_to_json(
         self,
-        pdf_path: str,
+        pdf_source: Union[str, Path, bytes, BinaryIO],
         output_path: Optional[str] = None,
-        save_file: bool = True
+        save_file: bool = True,
+        schema: str = "vtu"
     ) -> Dict:
         """
         Convert a PDF file to JSON format
         
         Args:
-            pdf_path: Path to the PDF file
-            output_path: Optional custom output path (default: same name as PDF with .json extension)
+            pdf_source: Path to the PDF file, or its bytes / a binary stream (e.g. an upload)
+            output_path: Optional custom output path (default: same name as PDF with .json extension;
+                required when saving a PDF given as bytes or a stream)
             save_file: Whether to save the JSON to a file (default: True)
+            schema: "vtu" for the flat texts/tables export (default) or "full" for docling's
+                complete document dict (debugging)
         
         Returns:
             Dictionary containing the extracted document data
         """
-        # Verify PDF exists
-        pdf_file = Path(pdf_path)
-        if not pdf_file.exists():
-            raise FileNotFoundError(f"PDF file '{pdf_path}' not found!")
+        if schema not in SCHEMAS:
+            raise ValueError(f"Unknown schema '{schema}' (expected one of {', '.join(SCHEMAS)})")
+
+        if isinstance(pdf_source, (str, Path)):
+            # Verify PDF exists
+            pdf_file = Path(pdf_source)
+            if not pdf_file.exists():
+                raise FileNotFoundError(f"PDF file '{pdf_source}' not found!")
+            probe = pdf_file
+            name = pdf_file.name
+        else:
+            # In-memory input goes to docling as a DocumentStream, with no temp file on disk
+            if save_file and output_path is None:
+                raise ValueError("output_path is required when saving a PDF given as bytes or a stream")
+            pdf_file = None
+            if isinstance(pdf_source, (bytes, bytearray)):
+                probe = io.BytesIO(pdf_source)
+            elif isinstance(pdf_source, io.BytesIO):
+                probe = pdf_source
+            else:
+                probe = io.BytesIO(pdf_source.read())
+            name = Path(getattr(pdf_source, "name", None) or "input.pdf").name
         
-        logger.info(f"Converting {pdf_file.name}...")
+        logger.info(f"Converting {name}...")
         
-        # Convert the PDF file
-        result = self.converter.convert(str(pdf_file))
+        # Convert the PDF file (OCR only when there is no usable text layer)
+        converter = self._text_converter if _has_text_layer(probe) else self.converter
+        if pdf_file is not None:
+            source = str(pdf_file)
+        else:
+            from docling.datamodel.base_models import DocumentStream
+
+            source = DocumentStream(name=name, stream=probe)
+        result = converter.convert(source)
         
         # Export to dictionary
-        doc_dict = result.document.export_to_dict()
+        doc_dict = result.document.export_to_dict() if schema == "full" else self.export_vtu_schema(result)
         
         # Save to file if requested
         if save_file:
@@ -68,8 +266,7 @@ class PDFConverter:
             else:
                 output_path = Path(output_path)
             
-            with output_path.open("w", encoding="utf-8") as f:
-                json.dump(doc_dict, f, ensure_ascii=False, indent=2)
+            _write_json(output_path, doc_dict)
             
             logger.info(f"✓ JSON saved to {output_path}")
         
@@ -78,14 +275,22 @@ class PDFConverter:
     def batch_convert(
         self,
         pdf_directory: str,
-        output_directory: Optional[str] = None
+        output_directory: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        schema: str = "vtu"
     ) -> Dict[str, bool]:
         """
         Convert all PDFs in a directory to JSON
         
+        PDFs already converted in an earlier run (same content hash, cached under
+        <output>/.cache) are copied from the cache instead of converted again.
+        
         Args:
             pdf_directory: Directory containing PDF files
             output_directory: Optional output directory (default: same as input)
+            max_workers: Conversion processes (default: one per CPU, at most one per file);
+                each loads its own Docling models, so lower this on small-memory machines
+            schema: JSON layout, as in convert_to_json
         
         Returns:
             Dictionary with filename: success status
@@ -97,23 +302,135 @@ class PDFConverter:
         output_dir = Path(output_directory) if output_directory else pdf_dir
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        results = {}
         pdf_files = list(pdf_dir.glob("*.pdf"))
+        results = dict.fromkeys((pdf_file.name for pdf_file in pdf_files), False)
         
         logger.info(f"Found {len(pdf_files)} PDF files")
-        
+
+        # Unchanged PDFs (same content hash as an earlier run) reuse the cached JSON
+        cache_dir = output_dir / ".cache"
+        cache_dir.mkdir(exist_ok=True)
+        # Threads block in read() with the GIL released, so this keeps several file reads in
+        # flight at once; that already covers what io_uring batching would buy for small PDFs
+        with ThreadPoolExecutor() as hash_pool:
+            digests = dict(zip(pdf_files, hash_pool.map(_file_digest, pdf_files)))
+        pending = []
         for pdf_file in pdf_files:
-            try:
-                output_path = output_dir / f"{pdf_file.stem}.json"
-                self.convert_to_json(str(pdf_file), str(output_path))
+            cache_path = cache_dir / f"{digests[pdf_file]}.{schema}.json"
+            if cache_path.exists():
+                shutil.copyfile(cache_path, output_dir / f"{pdf_file.stem}.json")
                 results[pdf_file.name] = True
-            except Exception as e:
-                logger.error(f"Failed to convert {pdf_file.name}: {str(e)}")
-                results[pdf_file.name] = False
+            else:
+                pending.append(pdf_file)
+        if len(pending) < len(pdf_files):
+            logger.info(f"Reused cached JSON for {len(pdf_files) - len(pending)} unchanged PDF files")
+        pdf_files = pending
+
+        workers = min(max_workers or os.cpu_count() or 1, len(pdf_files))
+        if workers <= 1:
+            # Serial conversion: an I/O thread reads the next PDF and writes the previous
+            # JSON while the current document converts
+            writes = {}
+            with ThreadPoolExecutor(max_workers=2) as io_pool:
+                read_future = io_pool.submit(pdf_files[0].read_bytes) if pdf_files else None
+                for i, pdf_file in enumerate(pdf_files):
+                    current, read_future = read_future, None
+                    if i + 1 < len(pdf_files):
+                        read_future = io_pool.submit(pdf_files[i + 1].read_bytes)
+                    try:
+                        stream = io.BytesIO(current.result())
+                        stream.name = pdf_file.name  # keeps the file name in logs and the document
+                        doc_dict = self.convert_to_json(stream, save_file=False, schema=schema)
+                        writes[io_pool.submit(
+                            _write_cached_json,
+                            output_dir / f"{pdf_file.stem}.json",
+                            cache_dir / f"{digests[pdf_file]}.{schema}.json",
+                            doc_dict,
+                        )] = pdf_file
+                    except Exception as e:
+                        logger.error(f"Failed to convert {pdf_file.name}: {str(e)}")
+            for future, pdf_file in writes.items():
+                error = future.exception()
+                if error is None:
+                    results[pdf_file.name] = True
+                else:
+                    logger.error(f"Failed to convert {pdf_file.name}: {str(error)}")
+            return results
+
+        # Documents are independent: convert them in parallel, one converter per worker
+        # process ("spawn" so each child starts clean and imports docling once)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {
+                executor.submit(_convert_one, str(pdf_file), str(output_dir / f"{pdf_file.stem}.json"), schema): pdf_file
+                for pdf_file in pdf_files
+            }
+            for future in as_completed(futures):
+                pdf_file = futures[future]
+                error = future.exception()
+                if error is None:
+                    output_path = output_dir / f"{pdf_file.stem}.json"
+                    shutil.copyfile(output_path, cache_dir / f"{digests[pdf_file]}.{schema}.json")
+                    results[pdf_file.name] = True
+                else:
+                    logger.error(f"Failed to convert {pdf_file.name}: {str(error)}")
+
+        return results
+
+    async def batch_convert_async(
+        self,
+        pdf_directory: str,
+        output_directory: Optional[str] = None,
+        max_concurrent: int = 1,
+        schema: str = "vtu"
+    ) -> Dict[str, bool]:
+        """
+        Convert all PDFs in a directory to JSON without blocking the event loop
+        
+        Args:
+            pdf_directory: Directory containing PDF files
+            output_directory: Optional output directory (default: same as input)
+            max_concurrent: Conversions admitted at once (raise it to match available GPUs)
+            schema: JSON layout, as in convert_to_json
+        
+        Returns:
+            Dictionary with filename: success status
+        """
+        pdf_dir = Path(pdf_directory)
+        if not pdf_dir.exists():
+            raise FileNotFoundError(f"Directory '{pdf_directory}' not found!")
+        
+        output_dir = Path(output_directory) if output_directory else pdf_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
         
+        pdf_files = list(pdf_dir.glob("*.pdf"))
+        logger.info(f"Found {len(pdf_files)} PDF files")
+
+        semaphore = asyncio.Semaphore(max(1, max_concurrent))
+
+        async def convert_one(pdf_file: Path) -> None:
+            async with semaphore:
+                # Probe, conversion and JSON write all run on a worker thread
+                await asyncio.to_thread(
+                    self.convert_to_json, str(pdf_file), str(output_dir / f"{pdf_file.stem}.json"), True, schema
+                )
+
+        # return_exceptions: one bad PDF doesn't abort the rest of the batch
+        outcomes = await asyncio.gather(*(convert_one(pdf_file) for pdf_file in pdf_files), return_exceptions=True)
+
+        results = {}
+        for pdf_file, outcome in zip(pdf_files, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Failed to convert {pdf_file.name}: {str(outcome)}")
+            results[pdf_file.name] = not isinstance(outcome, Exception)
         return results
 
 
+def _convert_one(pdf_path: str, output_path: str, schema: str) -> None:
+    """Convert one PDF inside a worker process (the document dict stays in the worker)."""
+    # The DocumentConverter is cached per process, so models load once per worker
+    PDFConverter().convert_to_json(pdf_path, output_path, schema=schema)
+
+
 def main():
     """Command-line interface for PDF conversion"""
     import argparse
@@ -122,19 +439,22 @@ def main():
     parser.add_argument('input', help='PDF file or directory path')
     parser.add_argument('-o', '--output', help='Output file or directory path')
     parser.add_argument('-b', '--batch', action='store_true', help='Batch mode for directory')
+    parser.add_argument('-j', '--workers', type=int, help='Parallel conversions in batch mode (default: CPU count)')
+    parser.add_argument('--full', action='store_true', help="Write docling's complete document dict (debugging)")
     
     args = parser.parse_args()
+    schema = "full" if args.full else "vtu"
     
     converter = PDFConverter()
     
     try:
         if args.batch:
-            results = converter.batch_convert(args.input, args.output)
+            results = converter.batch_convert(args.input, args.output, args.workers, schema)
             success = sum(1 for v in results.values() if v)
             total = len(results)
             print(f"\n✓ Converted {success}/{total} files successfully")
         else:
-            converter.convert_to_json(args.input, args.output)
+            converter.convert_to_json(args.input, args.output, schema=schema)
             print(f"\n✓ Conversion completed successfully")
     except Exception as e:
         print(f"\n❌ Error: {str(e)}")
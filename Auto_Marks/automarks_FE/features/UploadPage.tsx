@@ -28,6 +28,7 @@ interface WebSocketMessage {
   current_file?: string;
   current_file_index?: number;
   failed_files?: FailedFile[];
+  new_failed?: FailedFile[];
 }
 
 const UploadPage: React.FC = () => {
@@ -83,7 +84,12 @@ const UploadPage: React.FC = () => {
           errors: []
         });
 
-        // Handle failed files for popup
+        // Progress ticks only carry failures since the previous tick
+        if (data.new_failed && data.new_failed.length > 0) {
+          setFailedFiles((prev) => [...prev, ...data.new_failed!]);
+        }
+
+        // Handle failed files for popup (full list arrives with the final update)
         if (data.failed_files && data.failed_files.length > 0) {
           setFailedFiles(data.failed_files);
           if (data.status === 'completed' || data.status === 'failed') {